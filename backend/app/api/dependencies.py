@@ -1,9 +1,13 @@
 from fastapi import Header, HTTPException, status
+import hmac
 from app.core.config import settings
 
+# Encoded once at import; compared in constant time to avoid leaking the key through timing
+_API_KEY_BYTES = settings.API_KEY.encode("utf-8")
+
 def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")):
-    if x_api_key != settings.API_KEY:
+    if not hmac.compare_digest(x_api_key.encode("utf-8"), _API_KEY_BYTES):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or missing API key",
-        ) 
\ No newline at end of file
+        ) 
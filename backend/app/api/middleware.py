@@ -1,22 +1,167 @@
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-import time
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from time import perf_counter
 import logging
 from app.core.config import settings
+from app.services.rate_limit_service import rate_limit_service
 
 logger = logging.getLogger(__name__)
 
+
+class ObservabilityMiddleware:
+    """Pure ASGI middleware that logs requests, adds an X-Process-Time header and logs unhandled exceptions"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # The middleware stack is built after logging is configured, so the level check is resolved once here
+        self.info_enabled = logger.isEnabledFor(logging.INFO)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = perf_counter()
+        info_enabled = self.info_enabled
+        log_info = logger.info
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                # Calculate processing time
+                process_time = perf_counter() - start_time
+
+                # Log a single record per request
+                if info_enabled:
+                    method = scope["method"]
+                    path = scope["path"]
+                    status_code = message["status"]
+                    client_ip = scope["client"][0] if scope.get("client") else "unknown"
+                    # Scan the raw header list instead of building a Headers wrapper
+                    user_agent = "unknown"
+                    for name, value in scope["headers"]:
+                        if name == b"user-agent":
+                            user_agent = value.decode("latin-1")
+                            break
+                    log_info(
+                        f"Request completed: {method} {path} {status_code} ({process_time:.3f}s)",
+                        extra={
+                            "method": method,
+                            "path": path,
+                            "status_code": status_code,
+                            "process_time": process_time,
+                            "client_ip": client_ip,
+                            "user_agent": user_agent
+                        }
+                    )
+
+                # Add processing time to response headers
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", str(process_time).encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            logger.error(
+                f"Unhandled exception: {str(e)}",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "error": str(e)
+                }
+            )
+            raise
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware enforcing the per-client limit on generation endpoints"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.limited_paths = frozenset(
+            f"{settings.API_V1_STR}{path}" for path in ("/generate", "/generate-stream", "/feedback")
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.limited_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = self.client_ip(scope)
+        if not await rate_limit_service.is_allowed(client_ip):
+            logger.warning(f"Rate limit exceeded for {client_ip} on {scope['path']}")
+            response = JSONResponse(
+                {"detail": f"Rate limit exceeded: {rate_limit_service.limit} per 1 minute"},
+                status_code=429,
+                headers={"Retry-After": str(rate_limit_service.window_ms // 1000)}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def client_ip(scope: Scope) -> str:
+        """Client address, taken from the X-Forwarded-For hop our own proxy appended when one is configured"""
+        hops = settings.TRUSTED_PROXY_HOPS
+        if hops > 0:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    # Entries left of the trusted hops are client-supplied and can be spoofed
+                    forwarded = [entry.strip() for entry in value.decode("latin-1").split(",")]
+                    if len(forwarded) >= hops and forwarded[-hops]:
+                        return forwarded[-hops]
+                    break
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+
+class UploadSizeLimitMiddleware:
+    """Pure ASGI middleware rejecting oversized upload requests from Content-Length, before the form is parsed"""
+
+    # Room for the multipart boundaries, part headers and the tone field
+    FORM_OVERHEAD_BYTES = 64 * 1024
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.upload_paths = frozenset(
+            f"{settings.API_V1_STR}{path}" for path in ("/generate", "/generate-stream")
+        )
+        # Two files (resume and job description) per request
+        self.max_body_size = 2 * settings.MAX_FILE_SIZE + self.FORM_OVERHEAD_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in self.upload_paths:
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > self.max_body_size:
+                        response = JSONResponse(
+                            {"detail": f"Upload is too large (max {settings.MAX_FILE_SIZE // 1024 // 1024}MB per file)."},
+                            status_code=413
+                        )
+                        await response(scope, receive, send)
+                        return
+                    break
+
+        await self.app(scope, receive, send)
+
+
 def setup_middleware(app: FastAPI):
     """Configure all middleware for the FastAPI application"""
-    
-    # Rate limiting
-    limiter = Limiter(key_func=get_remote_address)
-    app.state.limiter = limiter
-    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-    
+
+    # Upload size pre-check (innermost, so 413 responses still carry CORS headers)
+    app.add_middleware(UploadSizeLimitMiddleware)
+
+    # Rate limiting (inside CORS, so 429 responses still carry CORS headers)
+    app.add_middleware(RateLimitMiddleware)
+
     # CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -25,57 +170,6 @@ def setup_middleware(app: FastAPI):
         allow_methods=["GET", "POST", "OPTIONS"],
         allow_headers=["X-API-Key", "Content-Type", "Authorization"],
     )
-    
-    # Request logging middleware
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        start_time = time.time()
-        
-        # Log request
-        logger.info(
-            f"Request: {request.method} {request.url.path}",
-            extra={
-                "method": request.method,
-                "path": request.url.path,
-                "client_ip": request.client.host if request.client else "unknown",
-                "user_agent": request.headers.get("user-agent", "unknown")
-            }
-        )
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Calculate processing time
-        process_time = time.time() - start_time
-        
-        # Log response
-        logger.info(
-            f"Response: {response.status_code} ({process_time:.3f}s)",
-            extra={
-                "status_code": response.status_code,
-                "process_time": process_time,
-                "method": request.method,
-                "path": request.url.path
-            }
-        )
-        
-        # Add processing time to response headers
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
-    
-    # Error handling middleware
-    @app.middleware("http")
-    async def error_handling(request: Request, call_next):
-        try:
-            return await call_next(request)
-        except Exception as e:
-            logger.error(
-                f"Unhandled exception: {str(e)}",
-                extra={
-                    "method": request.method,
-                    "path": request.url.path,
-                    "error": str(e)
-                }
-            )
-            raise
\ No newline at end of file
+
+    # Request logging and error handling middleware (outermost)
+    app.add_middleware(ObservabilityMiddleware)
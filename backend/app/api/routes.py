@@ -1,26 +1,48 @@
 from fastapi import APIRouter, UploadFile, Form, Depends, HTTPException, status, Request
-from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.responses import PlainTextResponse, JSONResponse, Response
 from typing import Optional
+import asyncio
 import logging
-from datetime import datetime
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+import orjson
+from datetime import datetime, timezone
+from app.core.config import settings
 from app.core.tracing import tracing_service
 from app.services.graph_service import GraphService
 from app.services.file_service import file_service
 from app.services.cache_service import cache_service
+from app.services.ai_service import ai_service
 from app.models.schemas import (
     CoverLetterRequest, CoverLetterResponse, FeedbackRequest,
-    ValidationResult, ErrorResponse, ToneEnum
+    ValidationResult, ErrorResponse, ToneEnum, GeneratorModelEnum
 )
 from app.api.dependencies import verify_api_key
-from app.workflows.nodes import input_validation_node
+from app.workflows.nodes import input_validation_node, document_issues
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-def get_limiter(request: Request):
-    return request.app.state.limiter
+_HEALTH_TEMPLATE = {"status": "healthy", "version": settings.VERSION}
+
+def _validation_error_message(resume_issues, job_issues) -> str:
+    """Render resume and job description issues as a single 400 detail"""
+    error_message = "Input validation failed\n"
+    if resume_issues:
+        error_message += f"Resume issues: {', '.join(resume_issues)}\n"
+    if job_issues:
+        error_message += f"Job description issues: {', '.join(job_issues)}"
+    return error_message
+
+async def extract_text_cached(upload: UploadFile, file_bytes: bytes) -> str:
+    """Extract text in a worker thread, short-circuiting uploads that recently failed extraction"""
+    key = cache_service.hash_upload(upload.filename or "", file_bytes)
+    cached_error = await cache_service.get_negative_async(key)
+    if cached_error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=cached_error)
+    try:
+        return await asyncio.to_thread(file_service.extract_text, upload, file_bytes)
+    except HTTPException as e:
+        await cache_service.set_negative_async(key, e.detail)
+        raise
 
 @router.options("/generate")
 async def options_generate():
@@ -34,6 +56,7 @@ async def generate_cover_letter(
     resume: UploadFile,
     job: UploadFile,
     tone: ToneEnum = Form(ToneEnum.PROFESSIONAL),
+    model: Optional[GeneratorModelEnum] = Form(None),
     graph_service: GraphService = Depends()
 ):
     """
@@ -42,20 +65,22 @@ async def generate_cover_letter(
     This endpoint:
     1. Validates uploaded files
     2. Extracts text content
-    3. Checks cache for parsed data
+    3. Rejects unreadable text, then parses both documents concurrently (served from cache when seen before)
     4. Runs the LangGraph workflow
     5. Returns the generated cover letter with metadata
     """
 
     try: 
-        resume_bytes = await resume.read()
+        resume_bytes, job_bytes = await asyncio.gather(
+            file_service.read_bounded(resume, settings.MAX_FILE_SIZE, "Resume"),
+            file_service.read_bounded(job, settings.MAX_FILE_SIZE, "Job description")
+        )
         resume_validation = file_service.validate_upload(resume, resume_bytes, "Resume")
         if not resume_validation.is_valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=resume_validation.error_message
             )
-        job_bytes = await job.read()
         job_validation = file_service.validate_upload(job, job_bytes, "Job description")
         if not job_validation.is_valid:
             raise HTTPException(
@@ -63,22 +88,37 @@ async def generate_cover_letter(
                 detail=job_validation.error_message
             )
         
-        resume_text = file_service.extract_text(resume, resume_bytes)
-        job_text = file_service.extract_text(job, job_bytes)
+        # Extraction is blocking CPU work (PDF/DOCX parsing), so run both off the event loop
+        resume_text, job_text = await asyncio.gather(
+            extract_text_cached(resume, resume_bytes),
+            extract_text_cached(job, job_bytes)
+        )
 
-        parsed_resume = cache_service.get_parsed_resume(resume_text)
-        if not parsed_resume:
-            logger.info("Resume not found in cache, will parse")
+        # Reject near-empty or unreadable uploads before the up-front parse spends LLM calls
+        # on them (and caches their verdicts)
+        resume_issues = document_issues(resume_text, "Resume")
+        job_issues = document_issues(job_text, "Job description")
+        if resume_issues or job_issues:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=_validation_error_message(resume_issues, job_issues)
+            )
 
-        parsed_job = cache_service.get_parsed_job(job_text)
-        if not parsed_job:
-            logger.info("Job not found in cache, will parse")
+        # Parse both documents concurrently up front; AIService serves repeats from the
+        # parsed-document cache, and the parser nodes reuse whatever is provided
+        parsed_resume = parsed_job = None
+        try:
+            parsed_resume, parsed_job = await ai_service.parse_resume_and_job_async(resume_text, job_text)
+        except Exception as e:
+            # Leave parsing to the workflow's parser nodes, which have their own fallbacks
+            logger.warning(f"Up-front parsing failed, deferring to workflow: {str(e)}")
         
         state = {
             "resume_posting": resume_text,
             "job_posting": job_text,
             "tone": tone.value,
-             "resume_info": parsed_resume or {},
+            "generator_model": model.value if model else None,
+            "resume_info": parsed_resume or {},
             "job_info": parsed_job or {}
         }
 
@@ -94,23 +134,13 @@ async def generate_cover_letter(
         
         if result.get("validation_failed"):
             validation_error = result.get("validation_error", {})
-            error_message = "Input validation failed\n"
-            if validation_error.get("resume_issues"):
-                error_message += f"Resume issues: {', '.join(validation_error['resume_issues'])}\n"
-            if validation_error.get("job_issues"):
-                error_message += f"Job description issues: {', '.join(validation_error['job_issues'])}"
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error_message
+                detail=_validation_error_message(
+                    validation_error.get("resume_issues"), validation_error.get("job_issues")
+                )
             )
         
-        # Cache parsed data if not already cached
-        if not parsed_resume and "resume_info" in result:
-            cache_service.set_parsed_resume(resume_text, result["resume_info"])
-        
-        if not parsed_job and "job_info" in result:
-            cache_service.set_parsed_job(job_text, result["job_info"])
-        
         # Build response
         response = CoverLetterResponse(
             cover_letter=result["cover_letter"],
@@ -123,7 +153,9 @@ async def generate_cover_letter(
         logger.info("Cover letter generated successfully", 
                    extra={"user_name": result.get("user_name"), "job_title": result["job_info"].get("title")})
         
-        return response
+        # The model is already validated; serialize it with pydantic-core directly so
+        # FastAPI does not re-validate it against response_model and run jsonable_encoder
+        return Response(content=response.model_dump_json(), media_type="application/json")
         
     except HTTPException:
         raise
@@ -146,6 +178,7 @@ async def generate_cover_letter_stream(
     resume: UploadFile,
     job: UploadFile,
     tone: ToneEnum = Form(ToneEnum.PROFESSIONAL),
+    model: Optional[GeneratorModelEnum] = Form(None),
     graph_service: GraphService = Depends()
 ):
     """
@@ -155,41 +188,47 @@ async def generate_cover_letter_stream(
     useful for showing progress to users during generation.
     """
     from fastapi.responses import StreamingResponse
-    import json
 
     async def event_generator():
         try:
             # File validation (same as non-streaming endpoint)
-            resume_bytes = await resume.read()
+            resume_bytes, job_bytes = await asyncio.gather(
+                file_service.read_bounded(resume, settings.MAX_FILE_SIZE, "Resume"),
+                file_service.read_bounded(job, settings.MAX_FILE_SIZE, "Job description")
+            )
             resume_validation = file_service.validate_upload(resume, resume_bytes, "Resume")
             if not resume_validation.is_valid:
-                yield f"data: {json.dumps({'error': resume_validation.error_message})}\n\n"
+                yield b"data: " + orjson.dumps({'error': resume_validation.error_message}) + b"\n\n"
                 return
-            job_bytes = await job.read()
             job_validation = file_service.validate_upload(job, job_bytes, "Job description")
             if not job_validation.is_valid:
-                yield f"data: {json.dumps({'error': job_validation.error_message})}\n\n"
+                yield b"data: " + orjson.dumps({'error': job_validation.error_message}) + b"\n\n"
                 return
             # Extract text
-            resume_text = file_service.extract_text(resume, resume_bytes)
-            job_text = file_service.extract_text(job, job_bytes)
+            resume_text, job_text = await asyncio.gather(
+                extract_text_cached(resume, resume_bytes),
+                extract_text_cached(job, job_bytes)
+            )
             # Stream workflow progress
             state = {
                 "resume_posting": resume_text,
                 "job_posting": job_text,
-                "tone": tone.value
+                "tone": tone.value,
+                "generator_model": model.value if model else None
             }
             # Execute workflow with streaming updates
             async for message in graph_service.invoke_graph_streaming(state):
                 yield message
+        except HTTPException as e:
+            yield b"data: " + orjson.dumps({'error': e.detail}) + b"\n\n"
         except Exception as e:
             logger.error(f"Streaming generation failed: {str(e)}")
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            yield b"data: " + orjson.dumps({'error': str(e)}) + b"\n\n"
 
     return StreamingResponse(
         event_generator(),
-        media_type="text/plain",
-        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
     )
 
 @router.post("/feedback", dependencies=[Depends(verify_api_key)])
@@ -239,11 +278,7 @@ async def provide_feedback(
 @router.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
-    return {
-        "status": "healthy",
-        "timestamp": str(datetime.utcnow()),
-        "version": "1.0.0"
-    }
+    return {**_HEALTH_TEMPLATE, "timestamp": datetime.now(timezone.utc).isoformat()}
 
 @router.get("/cache/stats")
 async def get_cache_stats():
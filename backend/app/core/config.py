@@ -2,6 +2,7 @@ from pydantic_settings import BaseSettings
 from pydantic import field_validator
 from typing import List
 import os
+import sys
 
 class Settings(BaseSettings):
     """Central configuration using Pydantic for type safety and validation"""
@@ -29,11 +30,29 @@ class Settings(BaseSettings):
     
     # File Upload Limits
     MAX_FILE_SIZE: int = 5 * 1024 * 1024  # 5MB
-    ALLOWED_EXTENSIONS: set = {".pdf", ".txt", ".docx"}
-    ALLOWED_MIME_TYPES: set = {"application/pdf", "text/plain", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+    ALLOWED_EXTENSIONS: frozenset[str] = frozenset(map(sys.intern, (".pdf", ".txt", ".docx")))
+    ALLOWED_MIME_TYPES: frozenset[str] = frozenset(map(sys.intern, (
+        "application/pdf",
+        "text/plain",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    )))
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 5
+    # Reverse proxies in front of the app (1 on Render); the client is read from the
+    # X-Forwarded-For entry that many hops from the right, which the proxy itself appended
+    TRUSTED_PROXY_HOPS: int = 0
+    # Outbound Anthropic budget per worker, enforced before each call
+    ANTHROPIC_REQUESTS_PER_MINUTE: int = 40
+    ANTHROPIC_INPUT_TOKENS_PER_MINUTE: int = 20000
+    
+    # Workflow Concurrency (threads dedicated to LangGraph runs)
+    MAX_CONCURRENT_GRAPHS: int = 8
+    # Matcher and validator responses are cached by prompt; letters are always regenerated
+    LLM_RESPONSE_CACHE_TTL: int = 7 * 24 * 3600
+    
+    # Draft the next revision while the validator runs; costs one extra generation per accepted letter
+    SPECULATIVE_RETRIES: bool = False
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = [
@@ -68,5 +87,13 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = True
 
+# Prompt descriptions for each ToneEnum value, looked up only when building the generation prompt
+TONE_DESCRIPTIONS: dict[str, str] = {
+    "professional": "Professional, concise, and clearly tailored to the role. Direct, specific, and achievement-focused. Avoids filler, excessive warmth, or verbosity.",
+    "emotional": "Emotionally intelligent, detailed, and clearly tailored to the role and mission. Shows initiative, reflection, and care — top-tier cover letter.",
+    "confident": "Confident, enthusiastic, and results-oriented. Emphasizes achievements and impact.",
+    "creative": "Creative, innovative, and forward-thinking. Shows unique perspective and problem-solving approach.",
+}
+
 # Global settings instance
 settings = Settings()
\ No newline at end of file
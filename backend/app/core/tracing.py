@@ -1,12 +1,19 @@
 from langfuse import get_client
+from opentelemetry import context as otel_context
 from functools import wraps
-import time
+from types import MappingProxyType
+from time import perf_counter
 import logging
+import queue
+import threading
 from typing import Optional, Dict, Any, Callable
 from .config import settings
 
 logger = logging.getLogger(__name__)
 
+_EMPTY = MappingProxyType({})
+GENERATION_QUEUE_SIZE = 1000
+
 class TracingService:
     """Centralized tracing service for Langfuse integration"""
 
@@ -15,32 +22,44 @@ class TracingService:
             self.langfuse = get_client()
         else:
             self.langfuse = None
+        self._extract_state_metadata = self._build_state_metadata_extractor()
+        # AI generation spans are recorded off the request path by a single worker thread
+        self._generation_queue: Optional[queue.Queue] = None
+        self._generation_worker: Optional[threading.Thread] = None
+        if self.langfuse:
+            self._generation_queue = queue.Queue(maxsize=GENERATION_QUEUE_SIZE)
+            self._generation_worker = threading.Thread(
+                target=self._process_generations, name="trace-worker", daemon=True
+            )
+            self._generation_worker.start()
 
     def trace_node(self, node_name: str) -> Callable:
         """Decorator to trace LangGraph nodes with detailed metrics"""
         def decorator(func: Callable) -> Callable:
+            # Tracing is configured once at startup, so skip the wrapper entirely when disabled
+            if self.langfuse is None:
+                return func
+
             @wraps(func)
             def wrapper(state: dict) -> dict:
-                if not self.langfuse:
-                    return func(state)
-                
                 metadata = self._extract_state_metadata(state)
-                start_time = time.time()
+                start_time = perf_counter()
                 
                 with self.langfuse.start_as_current_span(name=f"langgraph_node_{node_name}") as span:
                     span.update_trace(metadata=metadata)
                     try:
                         result = func(state)
-                        execution_time = time.time() - start_time
+                        execution_time = perf_counter() - start_time
                         span.update_trace(metadata={
                             **metadata,
                             "execution_time_ms": round(execution_time * 1000, 2),
                             "output_keys": list(result.keys()),
-                            "state_size": len(str(result))
+                            # Cheap size estimate: text fields (postings, letter) dominate the state
+                            "state_size": sum(len(v) for v in result.values() if isinstance(v, str))
                         })
                         return result
                     except Exception as e:
-                        execution_time = time.time() - start_time
+                        execution_time = perf_counter() - start_time
                         logger.error(f"Node {node_name} failed: {str(e)}")
                         span.update_trace(metadata={
                             **metadata,
@@ -54,12 +73,12 @@ class TracingService:
     def trace_api_request(self, endpoint_name: str) -> Callable:
         """Decorator to trace API endpoints with request/response data"""
         def decorator(func: Callable) -> Callable:
+            if self.langfuse is None:
+                return func
+
             @wraps(func)
             async def wrapper(*args, **kwargs):
-                if not self.langfuse:
-                    return await func(*args, **kwargs)
-                
-                start_time = time.time()
+                start_time = perf_counter()
                 
                 with self.langfuse.start_as_current_span(name=f"api_{endpoint_name}") as span:
                     span.update_trace(metadata={
@@ -69,14 +88,14 @@ class TracingService:
                     })
                     try:
                         result = await func(*args, **kwargs)
-                        execution_time = time.time() - start_time
+                        execution_time = perf_counter() - start_time
                         span.update_trace(metadata={
                             "execution_time_ms": round(execution_time * 1000, 2),
                             "result_type": type(result).__name__
                         })
                         return result
                     except Exception as e:
-                        execution_time = time.time() - start_time
+                        execution_time = perf_counter() - start_time
                         logger.error(f"API {endpoint_name} failed: {str(e)}")
                         span.update_trace(metadata={
                             "execution_time_ms": round(execution_time * 1000, 2),
@@ -93,9 +112,39 @@ class TracingService:
         response: str,
         metadata: Optional[Dict[str, Any]] = None
     ):
-        """Log AI model generations with detailed metrics"""
+        """Queue an AI model generation to be logged with detailed metrics"""
         if not self.langfuse:
             return
+        # Carry the caller's OpenTelemetry context so the span still nests under the active node span
+        try:
+            self._generation_queue.put_nowait(
+                (otel_context.get_current(), model_name, prompt, response, metadata)
+            )
+        except queue.Full:
+            logger.warning(f"Trace queue full, dropping ai_generation_{model_name}")
+
+    def _process_generations(self):
+        """Worker loop recording queued generations until shutdown enqueues None"""
+        while True:
+            item = self._generation_queue.get()
+            if item is None:
+                return
+            ctx, model_name, prompt, response, metadata = item
+            token = otel_context.attach(ctx)
+            try:
+                self._record_generation(model_name, prompt, response, metadata)
+            except Exception as e:
+                logger.warning(f"Failed to record ai_generation_{model_name}: {str(e)}")
+            finally:
+                otel_context.detach(token)
+
+    def _record_generation(
+        self,
+        model_name: str,
+        prompt: str,
+        response: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
         # You can use a span or generation here if you want more detail
         # For now, just log as a span
         with self.langfuse.start_as_current_span(name=f"ai_generation_{model_name}") as span:
@@ -107,17 +156,35 @@ class TracingService:
                 **(metadata or {})
             })
 
-    def _extract_state_metadata(self, state: dict) -> Dict[str, Any]:
-        """Extract relevant metadata from LangGraph state"""
-        return {
-            "job_title": state.get("job_info", {}).get("title", "Unknown"),
-            "company": state.get("job_info", {}).get("company", "Unknown"),
-            "user_name": state.get("user_name", "Unknown"),
-            "has_resume_info": "resume_info" in state,
-            "has_job_info": "job_info" in state,
-            "matched_experiences_count": len(state.get("matched_experiences", [])),
-            "state_keys": list(state.keys())
-        }
+    def shutdown(self, timeout: float = 5.0):
+        """Record queued generations and flush Langfuse before exit"""
+        if not self.langfuse:
+            return
+        self._generation_queue.put(None)
+        self._generation_worker.join(timeout)
+        self.langfuse.flush()
+
+    @staticmethod
+    def _build_state_metadata_extractor() -> Callable[[dict], Dict[str, Any]]:
+        """Build the LangGraph state metadata extractor once, with its constants bound as closure locals"""
+        empty = _EMPTY
+        unknown = "Unknown"
+
+        def extract_state_metadata(state: dict) -> Dict[str, Any]:
+            """Extract relevant metadata from LangGraph state"""
+            get = state.get
+            job_info = get("job_info") or empty
+            job_get = job_info.get
+            # Presence of resume_info/job_info is recoverable from state_keys, so it is not duplicated here
+            return {
+                "job_title": job_get("title", unknown),
+                "company": job_get("company", unknown),
+                "user_name": get("user_name", unknown),
+                "matched_experiences_count": len(get("matched_experiences") or ()),
+                "state_keys": tuple(state)
+            }
+
+        return extract_state_metadata
 
 # Global tracing service instance
 tracing_service = TracingService()
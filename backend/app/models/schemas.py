@@ -3,11 +3,17 @@ from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 from enum import Enum
 
+class GeneratorModelEnum(str, Enum):
+    """Models a request may pick for letter writing; by default Sonnet writes and Opus handles escalations"""
+    SONNET = "claude-3-7-sonnet"
+    OPUS = "claude-opus-4"
+
 class ToneEnum(str, Enum):
-    PROFESSIONAL = "Professional, concise, and clearly tailored to the role. Direct, specific, and achievement-focused. Avoids filler, excessive warmth, or verbosity."
-    EMOTIONAL = "Emotionally intelligent, detailed, and clearly tailored to the role and mission. Shows initiative, reflection, and care — top-tier cover letter."
-    CONFIDENT = "Confident, enthusiastic, and results-oriented. Emphasizes achievements and impact."
-    CREATIVE = "Creative, innovative, and forward-thinking. Shows unique perspective and problem-solving approach."
+    """Short tone codes; the prompt text for each lives in core.config.TONE_DESCRIPTIONS"""
+    PROFESSIONAL = "professional"
+    EMOTIONAL = "emotional"
+    CONFIDENT = "confident"
+    CREATIVE = "creative"
 
 
 class FileUploadResponse(BaseModel):
@@ -46,6 +52,20 @@ class MatchedExperience(BaseModel):
     relevance_score: float = Field(ge=0.0, le=1.0)
     transferable_skills: List[str] = Field(default_factory=list)
 
+class ParsedResume(ResumeInfo):
+    """Resume parser output, with the parser's check that the text is a resume"""
+    valid: bool = True
+    issues: List[str] = Field(default_factory=list)
+
+class ParsedJob(JobInfo):
+    """Job parser output, with the parser's check that the text is a job description"""
+    valid: bool = True
+    issues: List[str] = Field(default_factory=list)
+
+class MatchingResult(BaseModel):
+    """Relevance matcher output"""
+    matched_experiences: List[MatchedExperience] = Field(default_factory=list)
+
 class CoverLetterRequest(BaseModel):
     """Request model for cover letter generation"""
     resume_text: str = Field(..., min_length=100, description="Resume content")
@@ -117,4 +137,4 @@ class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
     error_code: Optional[str] = None
-    timestamp: str = Field(default_factory=lambda: str(datetime.utcnow()))
\ No newline at end of file
+    timestamp: str = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc).isoformat())
\ No newline at end of file
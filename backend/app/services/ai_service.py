@@ -1,28 +1,152 @@
+import anthropic
 from langchain_anthropic import ChatAnthropic
-from typing import Dict, Any, Optional
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Tuple, Type, Union
+import functools
 import time
 import random
 import logging
 from app.core.config import settings
 from app.core.tracing import tracing_service
+from app.models.schemas import ParsedJob, ParsedResume
+from app.services.cache_service import PARSE_CACHE_TTL_SECONDS, cache_service
 import asyncio
+import orjson
+import re
+import threading
 
 logger = logging.getLogger(__name__)
 
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\n?(.*?)\n?```", re.DOTALL)
+_JSON_BRACE_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# A system prompt is one block, or several sent in order; each block is its own prompt-cache
+# breakpoint, so a static block can hit across requests and a later per-request one across retries.
+# Anthropic allows four breakpoints per request.
+SystemPrompt = Union[str, Sequence[str]]
+
+
+def _system_parts(system: Optional[SystemPrompt]) -> Tuple[str, ...]:
+    if system is None:
+        return ()
+    return (system,) if isinstance(system, str) else tuple(system)
+
+
+def _system_blocks(system: Optional[SystemPrompt]) -> List[Dict[str, Any]]:
+    return [
+        {"type": "text", "text": part, "cache_control": {"type": "ephemeral"}}
+        for part in _system_parts(system)
+    ]
+
+
+# Letters are 250-350 words (~470 tokens); the cap stops runs past the target length
+LETTER_SETTINGS = {"temperature": 0.6, "max_tokens": 600}
+LETTER_MODEL_SUFFIX = "-letter"
+
+# Structured calls force this tool, so the model's output arrives as schema-shaped tool input
+OUTPUT_TOOL_NAME = "emit_result"
+
+
+@functools.cache
+def _output_tool(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Anthropic tool definition whose input schema is the given Pydantic model"""
+    return {
+        "name": OUTPUT_TOOL_NAME,
+        "description": f"Record the {schema.__name__} result",
+        "input_schema": schema.model_json_schema()
+    }
+
+
+def _response_text(response: Any, schema: Optional[Type[BaseModel]]) -> str:
+    """Model output as text; a forced tool call is serialized to JSON so callers and the cache see one format"""
+    if schema is not None and response.tool_calls:
+        return orjson.dumps(response.tool_calls[0]["args"]).decode()
+    content = response.content
+    return content if isinstance(content, str) else "".join(
+        block.get("text", "") for block in content if isinstance(block, dict)
+    )
+
+
+def _batch_message_text(message: Any) -> str:
+    """Batch result as text, serializing a forced tool call to JSON the same way _response_text does"""
+    for block in message.content:
+        if block.type == "tool_use":
+            return orjson.dumps(block.input).decode()
+    return "".join(block.text for block in message.content if block.type == "text")
+
+
+def _traced_prompt(prompt: str, system: Optional[SystemPrompt]) -> str:
+    """Flatten system blocks and prompt into one string for generation logs"""
+    return "\n\n".join((*_system_parts(system), prompt))
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    Callers reserve tokens up front and sleep for the returned delay, so sync
+    graph threads and async handlers share one budget without polling.
+    """
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.refill_per_second = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Take cost tokens (possibly going into debt) and return seconds to wait before proceeding"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+            self.updated = now
+            self.tokens -= min(cost, self.capacity)
+            return max(0.0, -self.tokens / self.refill_per_second)
+
+    def pause(self, seconds: float):
+        """Hold back every caller for at least seconds, e.g. after the API sends retry-after"""
+        with self._lock:
+            self.tokens = min(self.tokens, -seconds * self.refill_per_second)
+
+
+_request_bucket = TokenBucket(settings.ANTHROPIC_REQUESTS_PER_MINUTE)
+_input_token_bucket = TokenBucket(settings.ANTHROPIC_INPUT_TOKENS_PER_MINUTE)
+
+
+def _retry_delay(error: Exception, attempt: int, base_delay: float) -> float:
+    """Seconds to sleep before the next attempt, using jittered exponential backoff.
+
+    A retry-after from the API pauses the shared request bucket instead, so the
+    retry and every concurrent caller wait it out in their throttle step rather
+    than each hitting the limit in turn.
+    """
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        return base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+    _request_bucket.pause(delay)
+    return 0.0
+
 class AIService:
     """Centralized AI model management with retry logic and tracing"""
     def __init__(self):
         self.models: Dict[str, ChatAnthropic] = {}
+        self.structured_models: Dict[Tuple[str, Type[BaseModel]], Runnable] = {}
+        self._batch_client: Optional[anthropic.AsyncAnthropic] = None
         self._initialize_models()
 
     
     def _initialize_models(self):
-        """Initialize all AI models with appropriate configurations"""
+        """Register model configurations; ChatAnthropic instances are built lazily by get_model"""
         model_configs = {
             "claude-3-5-haiku": {
                 "model": "claude-3-5-haiku-20241022",
                 "temperature": 0.0,
-                "max_tokens": 256
+                "max_tokens": 1024
             },
             "claude-3-7-sonnet": {
                 "model": "claude-3-7-sonnet-20250219",
@@ -35,56 +159,118 @@ class AIService:
                 "max_tokens": 1024
             }
         }
+        # Letter variants carry the generation settings, whichever base model writes the letter
+        for model_name in list(model_configs):
+            model_configs[model_name + LETTER_MODEL_SUFFIX] = {**model_configs[model_name], **LETTER_SETTINGS}
 
+        self.model_configs = model_configs
 
-        #Abstract model bodies
-        for name, config in model_configs.items():
-            self.models[name] = ChatAnthropic(
+    def get_model(self, model_name: str) -> ChatAnthropic:
+        """Get a specific AI model by name, constructing it on first use"""
+        model = self.models.get(model_name)
+        if model is None:
+            if model_name not in self.model_configs:
+                raise ValueError(f"Unknown model: {model_name}")
+            config = self.model_configs[model_name]
+            # A race between graph threads only builds a spare instance; both are equivalent
+            model = self.models[model_name] = ChatAnthropic(
                 model=config["model"],
                 anthropic_api_key=settings.ANTHROPIC_API_KEY,
                 temperature=config["temperature"],
                 max_tokens=config["max_tokens"]
             )
-
-    def get_model(self, model_name: str) -> ChatAnthropic:
-        """Get a specific AI model by name"""
-        if model_name not in self.models:
-            raise ValueError(f"Unknown model: {model_name}")
-        return self.models[model_name]
+        return model
+
+    @staticmethod
+    def letter_model(model_name: str) -> str:
+        """Name of the letter variant of a model, with LETTER_SETTINGS applied"""
+        return model_name if model_name.endswith(LETTER_MODEL_SUFFIX) else model_name + LETTER_MODEL_SUFFIX
+
+    def get_structured_model(self, model_name: str, schema: Type[BaseModel]) -> Runnable:
+        """Get a model bound to emit one schema-shaped tool call instead of free text"""
+        key = (model_name, schema)
+        model = self.structured_models.get(key)
+        if model is None:
+            model = self.structured_models[key] = self.get_model(model_name).bind_tools(
+                [_output_tool(schema)], tool_choice=OUTPUT_TOOL_NAME
+            )
+        return model
     
+    @staticmethod
+    def _build_messages(prompt: str, system: Optional[SystemPrompt] = None):
+        """Build model input, marking each system block as an Anthropic prompt-cache breakpoint"""
+        if system is None:
+            return prompt
+        return [
+            SystemMessage(content=_system_blocks(system)),
+            HumanMessage(content=prompt)
+        ]
+
+    @staticmethod
+    def _throttle_delay(prompt: str, system: Optional[SystemPrompt] = None) -> float:
+        """Charge one request and the estimated input tokens (~4 chars each), returning the wait needed"""
+        estimated_tokens = (len(prompt) + sum(map(len, _system_parts(system)))) // 4
+        return max(_request_bucket.reserve(), _input_token_bucket.reserve(estimated_tokens))
+
     def invoke_with_retry(
         self,
         model_name: str,
         prompt: str,
         max_retries: int = 3,
         base_delay: float = 1.0,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        system: Optional[SystemPrompt] = None,
+        cache_ttl: Optional[int] = None,
+        output_schema: Optional[Type[BaseModel]] = None
     ) -> str:
-        """Synchronous version of invoke_with_retry for LangGraph nodes"""
-        model = self.get_model(model_name)
+        """Synchronous version of invoke_with_retry for LangGraph nodes.
+
+        With cache_ttl set, the response is cached by model and prompt, so only
+        pass it for calls whose answer should not change between identical inputs.
+        With output_schema set, the model is forced to answer through a tool call
+        matching the schema and the tool input is returned as JSON text.
+        """
+        prompt_hash = None
+        if cache_ttl:
+            schema_name = output_schema.__name__ if output_schema else ""
+            prompt_hash = cache_service.hash_content("\0".join((*_system_parts(system), prompt, schema_name)))
+            cached = cache_service.get_llm_response(model_name, prompt_hash)
+            if cached is not None:
+                logger.info(f"AI response served from cache: {model_name}")
+                return cached
+
+        model = self.get_structured_model(model_name, output_schema) if output_schema else self.get_model(model_name)
+        messages = self._build_messages(prompt, system)
 
         for attempt in range(max_retries):
             try:
-                start_time = time.time()
+                throttle = self._throttle_delay(prompt, system)
+                if throttle:
+                    logger.info(f"Throttling {model_name} call for {throttle:.2f}s")
+                    time.sleep(throttle)
+
+                start_ns = time.perf_counter_ns()
 
-                response = model.invoke(prompt)
-                response_text = response.content
+                response = model.invoke(messages)
+                response_text = _response_text(response, output_schema)
 
-                execution_time = time.time() - start_time
+                execution_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
 
                 # Log the AI generation using Langfuse
                 tracing_service.log_ai_generation(
                     model_name=model_name,
-                    prompt=prompt,
+                    prompt=_traced_prompt(prompt, system),
                     response=response_text,
                     metadata={
                         "attempt": attempt + 1,
-                        "execution_time_ms": round(execution_time * 1000, 2),
+                        "execution_time_ms": execution_ms,
                         **(metadata or {})
                     }
                 )
 
                 logger.info(f"AI generation successful: {model_name} (attempt {attempt + 1})")
+                if prompt_hash:
+                    cache_service.set_llm_response(model_name, prompt_hash, response_text, cache_ttl)
                 return response_text
             
             except Exception as e:
@@ -99,7 +285,7 @@ class AIService:
                     logger.error(f"AI generation failed: {model_name} - {str(e)}")
                     raise
                 
-                delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+                delay = _retry_delay(e, attempt, base_delay)
                 logger.warning(f"AI generation retry {attempt + 1}/{max_retries}")
                 time.sleep(delay)  # Use time.sleep instead of asyncio.sleep
         raise Exception(f"Max retries exceeded for {model_name}")
@@ -110,28 +296,36 @@ class AIService:
         prompt: str,
         max_retries: int = 3,
         base_delay: float = 1.0,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        system: Optional[SystemPrompt] = None,
+        output_schema: Optional[Type[BaseModel]] = None
     ) -> str:
         """Async version of invoke_with_retry for API endpoints"""
-        model = self.get_model(model_name)
+        model = self.get_structured_model(model_name, output_schema) if output_schema else self.get_model(model_name)
+        messages = self._build_messages(prompt, system)
 
         for attempt in range(max_retries):
             try:
-                start_time = time.time()
+                throttle = self._throttle_delay(prompt, system)
+                if throttle:
+                    logger.info(f"Throttling {model_name} call for {throttle:.2f}s")
+                    await asyncio.sleep(throttle)
+
+                start_ns = time.perf_counter_ns()
 
-                response = model.invoke(prompt)
-                response_text = response.content
+                response = await model.ainvoke(messages)
+                response_text = _response_text(response, output_schema)
 
-                execution_time = time.time() - start_time
+                execution_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
 
                 # Log the AI generation using Langfuse
                 tracing_service.log_ai_generation(
                     model_name=model_name,
-                    prompt=prompt,
+                    prompt=_traced_prompt(prompt, system),
                     response=response_text,
                     metadata={
                         "attempt": attempt + 1,
-                        "execution_time_ms": round(execution_time * 1000, 2),
+                        "execution_time_ms": execution_ms,
                         **(metadata or {})
                     }
                 )
@@ -151,11 +345,56 @@ class AIService:
                     logger.error(f"AI generation failed: {model_name} - {str(e)}")
                     raise
                 
-                delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+                delay = _retry_delay(e, attempt, base_delay)
                 logger.warning(f"AI generation retry {attempt + 1}/{max_retries}")
                 await asyncio.sleep(delay)
         raise Exception(f"Max retries exceeded for {model_name}")
     
+    async def stream_generate(
+        self,
+        model_name: str,
+        prompt: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        system: Optional[SystemPrompt] = None
+    ) -> AsyncIterator[str]:
+        """Stream text deltas from a model. Not retried, since tokens already sent cannot be taken back"""
+        model = self.get_model(model_name)
+        messages = self._build_messages(prompt, system)
+
+        throttle = self._throttle_delay(prompt, system)
+        if throttle:
+            logger.info(f"Throttling {model_name} call for {throttle:.2f}s")
+            await asyncio.sleep(throttle)
+
+        start_ns = time.perf_counter_ns()
+        first_token_ms = None
+        parts = []
+        async for chunk in model.astream(messages):
+            content = chunk.content
+            # Chunks carry either a plain string or a list of content blocks
+            delta = content if isinstance(content, str) else "".join(
+                block.get("text", "") for block in content if isinstance(block, dict)
+            )
+            if not delta:
+                continue
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
+            parts.append(delta)
+            yield delta
+
+        tracing_service.log_ai_generation(
+            model_name=model_name,
+            prompt=_traced_prompt(prompt, system),
+            response="".join(parts),
+            metadata={
+                "streamed": True,
+                "time_to_first_token_ms": first_token_ms,
+                "execution_time_ms": (time.perf_counter_ns() - start_ns) / 1_000_000,
+                **(metadata or {})
+            }
+        )
+        logger.info(f"AI streaming generation successful: {model_name}")
+    
     def create_system_prompt(self, role: str, instructions: str) -> str:
         """Create a standardized system prompt"""
         return f"""You are {role}.
@@ -164,9 +403,9 @@ class AIService:
 
 You must respond with only the requested information. Do not include any explanations, markdown formatting, or additional text unless specifically requested."""
     
-    def parse_resume(self, resume_text: str) -> Dict[str, Any]:
-        """Synchronous version of parse_resume for LangGraph nodes"""
-        system_prompt = self.create_system_prompt(
+    def _resume_system_prompt(self) -> str:
+        """System prompt shared by every resume parsing path"""
+        return self.create_system_prompt(
             role="a professional resume parser",
             instructions="""Extract structured information from the resume. Return ONLY a JSON object with:
 - name: string
@@ -175,108 +414,337 @@ You must respond with only the requested information. Do not include any explana
 - experience: array of objects with title, company, duration, description
 - education: array of objects with degree, institution, year
 - skills: array of strings
-- summary: string (if available)"""
+- summary: string (if available)
+- valid: boolean, false only if the text is clearly not a resume (random text, code, or completely unrelated content); be lenient about format and structure, and if in doubt mark as valid
+- issues: array of strings with the specific problems when valid is false, otherwise empty"""
         )
 
-        prompt = f"{system_prompt}\n\nResume:\n{resume_text}"
+    def _job_system_prompt(self) -> str:
+        """System prompt shared by every job parsing path"""
+        return self.create_system_prompt(
+            role="a professional job description parser",
+            instructions="""Extract structured information from the job posting. Return ONLY a JSON object with:
+- title: string
+- company: string
+- location: string (if found)
+- requirements: array of strings
+- responsibilities: array of strings
+- qualifications: array of strings
+- valid: boolean, false only if the text is clearly not a job description (random text, code, or completely unrelated content); accept informal descriptions and administrative or application text, and if in doubt mark as valid
+- issues: array of strings with the specific problems when valid is false, otherwise empty"""
+        )
+    
+    def parse_resume(self, resume_text: str) -> Dict[str, Any]:
+        """Synchronous version of parse_resume for LangGraph nodes"""
+        resume_hash = cache_service.hash_content(resume_text)
+        cached = cache_service.get_parsed_resume(resume_hash)
+        if cached:
+            logger.info("Resume parse served from cache")
+            return cached
+
+        system_prompt = self._resume_system_prompt()
+
+        prompt = f"Resume:\n{resume_text}"
 
         response = self.invoke_with_retry(
             model_name="claude-3-7-sonnet",
             prompt=prompt,
-            metadata={"operation": "resume_parsing"}
+            metadata={"operation": "resume_parsing"},
+            system=system_prompt,
+            output_schema=ParsedResume
         )
 
-        return self._parse_json_response(response)
+        parsed = self._parse_json_response(response)
+        cache_service.set_parsed_resume(resume_hash, parsed)
+        return parsed
     
     def parse_job(self, job_text: str) -> Dict[str, Any]:
         """Synchronous version of parse_job for LangGraph nodes"""
-        system_prompt = self.create_system_prompt(
-            role="a professional job description parser",
-            instructions="""Extract structured information from the job posting. Return ONLY a JSON object with:
-- title: string
-- company: string
-- location: string (if found)
-- requirements: array of strings
-- responsibilities: array of strings
-- qualifications: array of strings"""
-        )
+        job_hash = cache_service.hash_content(job_text)
+        cached = cache_service.get_parsed_job(job_hash)
+        if cached:
+            logger.info("Job parse served from cache")
+            return cached
 
-        prompt = f"{system_prompt}\n\nJob Description:\n{job_text}"
+        system_prompt = self._job_system_prompt()
+
+        prompt = f"Job Description:\n{job_text}"
 
         response = self.invoke_with_retry(
             model_name="claude-3-7-sonnet",
             prompt=prompt,
-            metadata={"operation": "job_parsing"}
+            metadata={"operation": "job_parsing"},
+            system=system_prompt,
+            output_schema=ParsedJob
         )
 
-        return self._parse_json_response(response)
+        parsed = self._parse_json_response(response)
+        cache_service.set_parsed_job(job_hash, parsed)
+        return parsed
     
     async def parse_resume_async(self, resume_text: str) -> Dict[str, Any]:
         """Async version of parse_resume for API endpoints"""
-        system_prompt = self.create_system_prompt(
-            role="a professional resume parser",
-            instructions="""Extract structured information from the resume. Return ONLY a JSON object with:
-- name: string
-- email: string (if found)
-- phone: string (if found)
-- experience: array of objects with title, company, duration, description
-- education: array of objects with degree, institution, year
-- skills: array of strings
-- summary: string (if available)"""
-        )
+        resume_hash = cache_service.hash_content(resume_text)
+        cached = await cache_service.get_parsed_resume_async(resume_hash)
+        if cached:
+            logger.info("Resume parse served from cache")
+            return cached
+
+        parsed = await self._parse_resume_uncached_async(resume_text)
+        await cache_service.set_parsed_resume_async(resume_hash, parsed)
+        return parsed
+
+    async def _parse_resume_uncached_async(self, resume_text: str) -> Dict[str, Any]:
+        system_prompt = self._resume_system_prompt()
 
-        prompt = f"{system_prompt}\n\nResume:\n{resume_text}"
+        prompt = f"Resume:\n{resume_text}"
 
         response = await self.invoke_with_retry_async(
             model_name="claude-3-7-sonnet",
             prompt=prompt,
-            metadata={"operation": "resume_parsing"}
+            metadata={"operation": "resume_parsing"},
+            system=system_prompt,
+            output_schema=ParsedResume
         )
 
         return self._parse_json_response(response)
     
     async def parse_job_async(self, job_text: str) -> Dict[str, Any]:
         """Async version of parse_job for API endpoints"""
-        system_prompt = self.create_system_prompt(
-            role="a professional job description parser",
-            instructions="""Extract structured information from the job posting. Return ONLY a JSON object with:
-- title: string
-- company: string
-- location: string (if found)
-- requirements: array of strings
-- responsibilities: array of strings
-- qualifications: array of strings"""
-        )
+        job_hash = cache_service.hash_content(job_text)
+        cached = await cache_service.get_parsed_job_async(job_hash)
+        if cached:
+            logger.info("Job parse served from cache")
+            return cached
+
+        parsed = await self._parse_job_uncached_async(job_text)
+        await cache_service.set_parsed_job_async(job_hash, parsed)
+        return parsed
 
-        prompt = f"{system_prompt}\n\nJob Description:\n{job_text}"
+    async def _parse_job_uncached_async(self, job_text: str) -> Dict[str, Any]:
+        system_prompt = self._job_system_prompt()
+
+        prompt = f"Job Description:\n{job_text}"
 
         response = await self.invoke_with_retry_async(
             model_name="claude-3-7-sonnet",
             prompt=prompt,
-            metadata={"operation": "job_parsing"}
+            metadata={"operation": "job_parsing"},
+            system=system_prompt,
+            output_schema=ParsedJob
         )
 
         return self._parse_json_response(response)
 
+    async def parse_resume_and_job_async(
+        self,
+        resume_text: str,
+        job_text: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Parse a resume and a job description concurrently, with one cache round-trip each way"""
+        resume_key = cache_service.resume_key(cache_service.hash_content(resume_text))
+        job_key = cache_service.job_key(cache_service.hash_content(job_text))
+        parsed_resume, parsed_job = await cache_service.multi_get_async([resume_key, job_key])
+
+        pending = {}
+        if parsed_resume:
+            logger.info("Resume parse served from cache")
+        else:
+            pending[resume_key] = self._parse_resume_uncached_async(resume_text)
+        if parsed_job:
+            logger.info("Job parse served from cache")
+        else:
+            pending[job_key] = self._parse_job_uncached_async(job_text)
+
+        if pending:
+            fresh = dict(zip(pending, await asyncio.gather(*pending.values())))
+            await cache_service.multi_set_async(fresh, PARSE_CACHE_TTL_SECONDS)
+            parsed_resume = parsed_resume or fresh[resume_key]
+            parsed_job = parsed_job or fresh[job_key]
+        return parsed_resume, parsed_job
+
+    async def parse_resumes_batch(
+        self,
+        resume_texts: List[str],
+        model_name: str = "claude-3-7-sonnet",
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 60.0,
+        timeout: float = 3600.0
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Parse many resumes through the Anthropic Message Batches API (half price, not latency-critical).
+
+        Cached and duplicate resumes are not resubmitted. Results are returned in input
+        order; entries whose batch request failed are None.
+        """
+        return await self._parse_documents_batch(
+            resume_texts, "Resume", self._resume_system_prompt(), ParsedResume,
+            cache_service.get_parsed_resume_async, cache_service.set_parsed_resume_async,
+            model_name, poll_interval, max_poll_interval, timeout
+        )
+
+    async def parse_jobs_batch(
+        self,
+        job_texts: List[str],
+        model_name: str = "claude-3-7-sonnet",
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 60.0,
+        timeout: float = 3600.0
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Parse many job descriptions through the Message Batches API, like parse_resumes_batch"""
+        return await self._parse_documents_batch(
+            job_texts, "Job Description", self._job_system_prompt(), ParsedJob,
+            cache_service.get_parsed_job_async, cache_service.set_parsed_job_async,
+            model_name, poll_interval, max_poll_interval, timeout
+        )
+
+    async def _parse_documents_batch(
+        self,
+        texts: List[str],
+        label: str,
+        system_prompt: str,
+        output_schema: Type[BaseModel],
+        get_cached: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+        set_cached: Callable[[str, Dict[str, Any]], Awaitable[bool]],
+        model_name: str,
+        poll_interval: float,
+        max_poll_interval: float,
+        timeout: float
+    ) -> List[Optional[Dict[str, Any]]]:
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        indices_by_hash: Dict[str, List[int]] = {}
+        text_by_hash: Dict[str, str] = {}
+        for index, text in enumerate(texts):
+            text_hash = cache_service.hash_content(text)
+            indices_by_hash.setdefault(text_hash, []).append(index)
+            text_by_hash.setdefault(text_hash, text)
+
+        pending: Dict[str, str] = {}
+        for text_hash, text in text_by_hash.items():
+            cached = await get_cached(text_hash)
+            if cached:
+                for index in indices_by_hash[text_hash]:
+                    results[index] = cached
+            else:
+                pending[text_hash] = text
+        if not pending:
+            return results
+
+        # The content hash doubles as custom_id (32 hex chars, within the 64-char limit)
+        responses = await self.submit_batch(
+            [
+                self.batch_request(text_hash, model_name, f"{label}:\n{text}", system_prompt, output_schema)
+                for text_hash, text in pending.items()
+            ],
+            label=label,
+            poll_interval=poll_interval,
+            max_poll_interval=max_poll_interval,
+            timeout=timeout
+        )
+
+        for text_hash, response_text in responses.items():
+            try:
+                parsed = self._parse_json_response(response_text)
+            except ValueError as e:
+                logger.warning(f"{label} batch request {text_hash} returned invalid JSON: {str(e)}")
+                continue
+            await set_cached(text_hash, parsed)
+            for index in indices_by_hash.get(text_hash, ()):
+                results[index] = parsed
+
+        return results
+
+    def batch_request(
+        self,
+        custom_id: str,
+        model_name: str,
+        prompt: str,
+        system: Optional[SystemPrompt] = None,
+        output_schema: Optional[Type[BaseModel]] = None
+    ) -> Dict[str, Any]:
+        """Build one Message Batches entry with the model's settings, caching the system prompt like _build_messages.
+
+        With output_schema set, the entry forces the same emit_result tool as invoke_with_retry.
+        """
+        config = self.model_configs[model_name]
+        params: Dict[str, Any] = {
+            "model": config["model"],
+            "max_tokens": config["max_tokens"],
+            "temperature": config["temperature"],
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        if system is not None:
+            params["system"] = _system_blocks(system)
+        if output_schema is not None:
+            params["tools"] = [_output_tool(output_schema)]
+            params["tool_choice"] = {"type": "tool", "name": OUTPUT_TOOL_NAME}
+        return {"custom_id": custom_id, "params": params}
+
+    async def submit_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        label: str = "Message",
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 60.0,
+        timeout: float = 3600.0
+    ) -> Dict[str, str]:
+        """Run requests (see batch_request) through the Message Batches API and wait for them to end.
+
+        Returns response text by custom_id; failed, expired or cancelled requests are left out.
+        """
+        if not requests:
+            return {}
+        client = self._get_batch_client()
+        batch = await client.messages.batches.create(requests=requests)
+        logger.info(f"Submitted {label.lower()} batch {batch.id} with {len(requests)} requests")
+
+        # Poll with exponential backoff until the batch has ended
+        deadline = time.monotonic() + timeout
+        delay = poll_interval
+        while batch.processing_status != "ended":
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"{label} batch {batch.id} did not finish within {timeout}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+            batch = await client.messages.batches.retrieve(batch.id)
+
+        responses: Dict[str, str] = {}
+        async for entry in await client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                logger.warning(f"{label} batch request {entry.custom_id} {entry.result.type}")
+                continue
+            responses[entry.custom_id] = _batch_message_text(entry.result.message)
+        return responses
+
+    def _get_batch_client(self) -> anthropic.AsyncAnthropic:
+        """Anthropic SDK client for the Message Batches API, created on first use"""
+        if self._batch_client is None:
+            self._batch_client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+        return self._batch_client
+
     def _parse_json_response(self, response: str) -> Dict[str, Any]:
         """Parse JSON from AI response with error handling"""
-        import json
-        import re
+        # Most responses are a bare JSON object; try that before the regex scans
+        stripped = response.strip()
+        if stripped.startswith("{"):
+            try:
+                return orjson.loads(stripped)
+            except orjson.JSONDecodeError:
+                pass
 
-        json_match = re.search(r"```(?:json)?\n?(.*?)\n?```", response, re.DOTALL)
+        json_match = _JSON_FENCE_RE.search(response)
 
         if json_match:
             json_str=json_match.group(1).strip()
         else:
-            json_match = re.search(r"\{.*\}", response, re.DOTALL)
+            json_match = _JSON_BRACE_RE.search(response)
             if json_match:
                 json_str = json_match.group(0)
             else:
                 raise ValueError("No valid JSON found in response")
             
         try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
+            return orjson.loads(json_str)
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON: {json_str}")
             raise ValueError(f"Invalid JSON response: {str(e)}")
         
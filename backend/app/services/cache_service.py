@@ -1,35 +1,71 @@
 import redis
-import hashlib
+import redis.asyncio as aioredis
+import xxhash
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from app.core.config import settings
 from app.core.tracing import tracing_service
-import json
+import gzip
+import orjson
+import zlib
 
 
 logger = logging.getLogger(__name__)
 
+# Values larger than this are gzip-compressed and stored with GZIP_PREFIX
+COMPRESS_THRESHOLD_BYTES = 1024
+GZIP_PREFIX = b"gz:"
+# A truncated or corrupt gzip payload raises EOFError or zlib.error rather than OSError
+_DECOMPRESS_ERRORS = (OSError, EOFError, zlib.error)
+MAX_CONNECTIONS = 50
+# Parses are pure functions of the document text; bump the version when the parser prompts or schemas change
+PARSE_CACHE_VERSION = 2
+PARSE_CACHE_TTL_SECONDS = 30 * 86400
+
 class CacheService:
     """Redis-based caching service with automatic serialization. Redis is optional; if connection fails, cache is disabled and the app still runs."""
 
     def __init__(self):
         self.redis_client = None
+        self.async_client: Optional[aioredis.Redis] = None
         self._available = False
         try:
+            # Sync client for LangGraph nodes running in worker threads
             self.redis_client = redis.from_url(
                 settings.REDIS_URL,
-                decode_responses=True,
+                decode_responses=False,
+                max_connections=MAX_CONNECTIONS,
+                socket_keepalive=True,
                 socket_connect_timeout=5,
                 socket_timeout=5
             )
             self.redis_client.ping()
+            # Async client for request handlers so cache ops do not block the event loop
+            self.async_client = aioredis.from_url(
+                settings.REDIS_URL,
+                decode_responses=False,
+                max_connections=MAX_CONNECTIONS,
+                socket_keepalive=True,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
             self._available = True
             logger.info("Redis connection established")
         except Exception as e:
             logger.warning("Redis connection failed (cache disabled): %s", str(e))
             self.redis_client = None
+            self.async_client = None
             self._available = False
 
+    async def close(self):
+        """Close both Redis connection pools"""
+        if self.async_client:
+            await self.async_client.close()
+            await self.async_client.connection_pool.disconnect()
+        if self.redis_client:
+            self.redis_client.close()
+            self.redis_client.connection_pool.disconnect()
+
     def _test_connection(self):
         """Re-check Redis availability (no-op if already known unavailable)."""
         if not self._available:
@@ -41,36 +77,106 @@ class CacheService:
             self._available = False
     
 
-    def _generate_key(self, prefix: str, content: str) -> str:
-        """Generate cache key from content hash"""
-        content_hash = hashlib.sha256(content.encode()).hexdigest()
-        return f"{prefix}:{content_hash}"
-    
+    @staticmethod
+    def hash_content(content: str) -> str:
+        """Hash whitespace-normalized content into a compact cache key component"""
+        normalized = " ".join(content.split())
+        return xxhash.xxh3_128_hexdigest(normalized.encode())
+
+    @staticmethod
+    def hash_upload(filename: str, file_bytes: bytes) -> str:
+        """Hash an upload's filename and raw bytes, for results that depend on both"""
+        digest = xxhash.xxh3_128(filename.encode())
+        digest.update(b"\0")
+        digest.update(file_bytes)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _serialize(value: Dict[str, Any]) -> bytes:
+        """Serialize to JSON, compressing payloads above COMPRESS_THRESHOLD_BYTES"""
+        serialized = orjson.dumps(value)
+        if len(serialized) > COMPRESS_THRESHOLD_BYTES:
+            serialized = GZIP_PREFIX + gzip.compress(serialized)
+        return serialized
+
+    @staticmethod
+    def _deserialize(value: bytes) -> Dict[str, Any]:
+        """Inverse of _serialize"""
+        if isinstance(value, bytes) and value.startswith(GZIP_PREFIX):
+            value = gzip.decompress(value[len(GZIP_PREFIX):])
+        return orjson.loads(value)
+
     def get(self, key: str) -> Optional[Dict[str, Any]]:
-        """Get value from cache with automatic JSON deserialization"""
+        """Get value from cache with automatic decompression and JSON deserialization"""
         if not self._available or not self.redis_client:
             return None
         try:
             value = self.redis_client.get(key)
-            if value:
-                return json.loads(value)
+            return self._deserialize(value) if value else None
+        except (orjson.JSONDecodeError, *_DECOMPRESS_ERRORS, redis.RedisError) as e:
+            logger.warning(f"Cache get failed for key {key}: {str(e)}")
+            return None
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        """Async version of get for request handlers"""
+        if not self._available or not self.async_client:
+            return None
+        try:
+            value = await self.async_client.get(key)
+            return self._deserialize(value) if value else None
+        except (orjson.JSONDecodeError, *_DECOMPRESS_ERRORS, redis.RedisError) as e:
+            logger.warning(f"Cache get failed for key {key}: {str(e)}")
             return None
-        except (json.JSONDecodeError, redis.RedisError) as e:
+
+    async def get_raw_async(self, key: str) -> Optional[bytes]:
+        """Get the stored bytes (decompressed, not JSON-decoded), e.g. to send straight to a client"""
+        if not self._available or not self.async_client:
+            return None
+        try:
+            value = await self.async_client.get(key)
+            if value and value.startswith(GZIP_PREFIX):
+                value = gzip.decompress(value[len(GZIP_PREFIX):])
+            return value
+        except (*_DECOMPRESS_ERRORS, redis.RedisError) as e:
             logger.warning(f"Cache get failed for key {key}: {str(e)}")
             return None
 
+    async def set_raw_async(self, key: str, value: bytes, expire_seconds: int = 86400) -> bool:
+        """Store bytes as-is, without JSON serialization or compression"""
+        if not self._available or not self.async_client:
+            return False
+        try:
+            return await self.async_client.setex(key, expire_seconds, value)
+        except redis.RedisError as e:
+            logger.warning(f"Cache set failed for key {key}: {str(e)}")
+            return False
+
     def set(
         self,
         key: str,
         value: Dict[str, Any],
         expire_seconds: int = 86400  # 24 hours default
     ) -> bool:
-        """Set value in cache with automatic JSON serialization"""
+        """Set value in cache with automatic JSON serialization, compressing large payloads"""
         if not self._available or not self.redis_client:
             return False
         try:
-            serialized = json.dumps(value)
-            return self.redis_client.setex(key, expire_seconds, serialized)
+            return self.redis_client.setex(key, expire_seconds, self._serialize(value))
+        except (TypeError, redis.RedisError) as e:
+            logger.warning(f"Cache set failed for key {key}: {str(e)}")
+            return False
+
+    async def set_async(
+        self,
+        key: str,
+        value: Dict[str, Any],
+        expire_seconds: int = 86400
+    ) -> bool:
+        """Async version of set for request handlers"""
+        if not self._available or not self.async_client:
+            return False
+        try:
+            return await self.async_client.setex(key, expire_seconds, self._serialize(value))
         except (TypeError, redis.RedisError) as e:
             logger.warning(f"Cache set failed for key {key}: {str(e)}")
             return False
@@ -84,36 +190,148 @@ class CacheService:
         except redis.RedisError as e:
             logger.warning(f"Cache delete failed for key {key}: {str(e)}")
             return False
+
+    async def delete_async(self, key: str) -> bool:
+        """Async version of delete for request handlers"""
+        if not self._available or not self.async_client:
+            return False
+        try:
+            return bool(await self.async_client.delete(key))
+        except redis.RedisError as e:
+            logger.warning(f"Cache delete failed for key {key}: {str(e)}")
+            return False
     
-    def get_parsed_resume(self, resume_text: str) -> Optional[Dict[str, Any]]:
-        """Get cached parsed resume data"""
-        key = self._generate_key("resume", resume_text)
-        return self.get(key)
+    async def multi_get_async(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Get several values in one MGET round-trip; misses and undecodable entries are None"""
+        if not self._available or not self.async_client:
+            return [None] * len(keys)
+        try:
+            values = await self.async_client.mget(keys)
+        except redis.RedisError as e:
+            logger.warning(f"Cache mget failed for keys {keys}: {str(e)}")
+            return [None] * len(keys)
+        results = []
+        for key, value in zip(keys, values):
+            try:
+                results.append(self._deserialize(value) if value else None)
+            except (orjson.JSONDecodeError, *_DECOMPRESS_ERRORS) as e:
+                logger.warning(f"Cache get failed for key {key}: {str(e)}")
+                results.append(None)
+        return results
+
+    async def multi_set_async(
+        self,
+        items: Dict[str, Dict[str, Any]],
+        expire_seconds: int = 86400
+    ) -> bool:
+        """Set several values with pipelined SETEX in one round-trip"""
+        if not items or not self._available or not self.async_client:
+            return False
+        try:
+            async with self.async_client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.setex(key, expire_seconds, self._serialize(value))
+                return all(await pipe.execute())
+        except (TypeError, redis.RedisError) as e:
+            logger.warning(f"Cache mset failed for keys {list(items)}: {str(e)}")
+            return False
+    
+    @staticmethod
+    def resume_key(resume_hash: str) -> str:
+        """Cache key for a parsed resume"""
+        return f"resume:v{PARSE_CACHE_VERSION}:{resume_hash}"
+    
+    @staticmethod
+    def job_key(job_hash: str) -> str:
+        """Cache key for a parsed job description"""
+        return f"job:v{PARSE_CACHE_VERSION}:{job_hash}"
+    
+    def get_parsed_resume(self, resume_hash: str) -> Optional[Dict[str, Any]]:
+        """Get cached parsed resume data by content hash (see hash_content)"""
+        return self.get(self.resume_key(resume_hash))
     
     def set_parsed_resume(
         self,
-        resume_text: str,
+        resume_hash: str,
         parsed_data: Dict[str, Any],
-        expire_seconds: int = 86400
+        expire_seconds: int = PARSE_CACHE_TTL_SECONDS
     ) -> bool:
-        """Cache parsed resume data"""
-        key = self._generate_key("resume", resume_text)
-        return self.set(key, parsed_data, expire_seconds)
+        """Cache parsed resume data by content hash"""
+        return self.set(self.resume_key(resume_hash), parsed_data, expire_seconds)
     
-    def get_parsed_job(self, job_text: str) -> Optional[Dict[str, Any]]:
-        """Get cached parsed job data"""
-        key = self._generate_key("job", job_text)
-        return self.get(key)
+    def get_parsed_job(self, job_hash: str) -> Optional[Dict[str, Any]]:
+        """Get cached parsed job data by content hash (see hash_content)"""
+        return self.get(self.job_key(job_hash))
     
     def set_parsed_job(
         self,
-        job_text: str,
+        job_hash: str,
         parsed_data: Dict[str, Any],
-        expire_seconds: int = 86400
+        expire_seconds: int = PARSE_CACHE_TTL_SECONDS
+    ) -> bool:
+        """Cache parsed job data by content hash"""
+        return self.set(self.job_key(job_hash), parsed_data, expire_seconds)
+    
+    @staticmethod
+    def response_key(model_name: str, prompt_hash: str) -> str:
+        """Cache key for an LLM response to a given model and prompt"""
+        return f"llm:{model_name}:{prompt_hash}"
+    
+    def get_llm_response(self, model_name: str, prompt_hash: str) -> Optional[str]:
+        """Get a cached LLM response text by model and prompt hash (see hash_content)"""
+        cached = self.get(self.response_key(model_name, prompt_hash))
+        return cached.get("response") if cached else None
+    
+    def set_llm_response(
+        self,
+        model_name: str,
+        prompt_hash: str,
+        response: str,
+        expire_seconds: int = 7 * 86400
+    ) -> bool:
+        """Cache an LLM response text by model and prompt hash"""
+        return self.set(self.response_key(model_name, prompt_hash), {"response": response}, expire_seconds)
+    
+    async def get_parsed_resume_async(self, resume_hash: str) -> Optional[Dict[str, Any]]:
+        """Async version of get_parsed_resume"""
+        return await self.get_async(self.resume_key(resume_hash))
+    
+    async def set_parsed_resume_async(
+        self,
+        resume_hash: str,
+        parsed_data: Dict[str, Any],
+        expire_seconds: int = PARSE_CACHE_TTL_SECONDS
+    ) -> bool:
+        """Async version of set_parsed_resume"""
+        return await self.set_async(self.resume_key(resume_hash), parsed_data, expire_seconds)
+    
+    async def get_parsed_job_async(self, job_hash: str) -> Optional[Dict[str, Any]]:
+        """Async version of get_parsed_job"""
+        return await self.get_async(self.job_key(job_hash))
+    
+    async def set_parsed_job_async(
+        self,
+        job_hash: str,
+        parsed_data: Dict[str, Any],
+        expire_seconds: int = PARSE_CACHE_TTL_SECONDS
+    ) -> bool:
+        """Async version of set_parsed_job"""
+        return await self.set_async(self.job_key(job_hash), parsed_data, expire_seconds)
+    
+    async def get_negative_async(self, upload_hash: str) -> Optional[str]:
+        """Get the cached error for an upload that recently failed processing"""
+        cached = await self.get_raw_async(f"neg:{upload_hash}")
+        return cached.decode() if cached else None
+    
+    async def set_negative_async(
+        self,
+        upload_hash: str,
+        error_message: str,
+        expire_seconds: int = 300
     ) -> bool:
-        """Cache parsed job data"""
-        key = self._generate_key("job", job_text)
-        return self.set(key, parsed_data, expire_seconds)
+        """Cache a processing error for an upload with a short TTL"""
+        # Stored as plain UTF-8 rather than JSON, since only the message is ever read back
+        return await self.set_raw_async(f"neg:{upload_hash}", error_message.encode(), expire_seconds)
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics for monitoring"""
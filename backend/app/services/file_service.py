@@ -1,7 +1,10 @@
 from fastapi import UploadFile, HTTPException, status
-import PyPDF2
+import pypdfium2 as pdfium
 import io
-import hashlib
+import os
+import threading
+import zipfile
+from lxml import etree
 from typing import Tuple, Optional
 import logging
 from app.core.config import settings
@@ -9,6 +12,13 @@ from app.models.schemas import FileUploadResponse
 
 logger = logging.getLogger(__name__)
 
+READ_CHUNK_SIZE = 64 * 1024  # 64 KiB
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# Decompressed cap for word/document.xml, so a small upload cannot inflate into a zip bomb
+MAX_DOCX_XML_SIZE = 20 * 1024 * 1024  # 20 MiB
+# PDFium is not thread-safe, even across documents, so every call into it is serialized
+_PDFIUM_LOCK = threading.Lock()
+
 class FileService:
     """Centralized file handling with validation and processing"""
     
@@ -31,17 +41,8 @@ class FileService:
             )
         
         # Check file extension
-        if "." in file.filename:
-            ext = file.filename.lower().rsplit(".", 1)[-1]
-            if f".{ext}" not in settings.ALLOWED_EXTENSIONS:
-                return FileUploadResponse(
-                    filename=file.filename,
-                    size=len(file_bytes),
-                    content_type=file.content_type,
-                    is_valid=False,
-                    error_message=f"{file_label} file type not allowed. Only {', '.join(settings.ALLOWED_EXTENSIONS)} are supported."
-                )
-        else:
+        ext = os.path.splitext(file.filename)[1].lower()
+        if not ext:
             return FileUploadResponse(
                 filename=file.filename,
                 size=len(file_bytes),
@@ -49,6 +50,14 @@ class FileService:
                 is_valid=False,
                 error_message=f"{file_label} file must have a valid extension."
             )
+        if ext not in settings.ALLOWED_EXTENSIONS:
+            return FileUploadResponse(
+                filename=file.filename,
+                size=len(file_bytes),
+                content_type=file.content_type,
+                is_valid=False,
+                error_message=f"{file_label} file type not allowed. Only {', '.join(sorted(settings.ALLOWED_EXTENSIONS))} are supported."
+            )
         
         # Check MIME type
         if file.content_type not in settings.ALLOWED_MIME_TYPES:
@@ -67,6 +76,28 @@ class FileService:
             is_valid=True
         )
     
+    @staticmethod
+    async def read_bounded(upload: UploadFile, limit: int, file_label: str = "File") -> bytearray:
+        """Read an upload in chunks, rejecting it as soon as it exceeds the size limit"""
+        # The multipart parser records the spooled size, so known-oversized files are rejected unread
+        if upload.size is not None and upload.size > limit:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"{file_label} file is too large (max {limit // 1024 // 1024}MB)."
+            )
+        buffer = bytearray()
+        while True:
+            chunk = await upload.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+            if len(buffer) > limit:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"{file_label} file is too large (max {limit // 1024 // 1024}MB)."
+                )
+        return buffer
+    
     @staticmethod
     def extract_text(file: UploadFile, file_bytes: bytes) -> str:
         """Extract text content from uploaded file"""
@@ -86,19 +117,26 @@ class FileService:
     
     @staticmethod
     def _extract_pdf_text(file_bytes: bytes) -> str:
-        """Extract text from PDF file"""
+        """Extract text from PDF file using the native PDFium engine"""
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
             text_parts = []
-            
-            for page_num, page in enumerate(pdf_reader.pages):
+            with _PDFIUM_LOCK:
+                pdf = pdfium.PdfDocument(bytes(file_bytes))
                 try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-                except Exception as e:
-                    logger.warning(f"Failed to extract text from page {page_num}: {str(e)}")
-                    continue
+                    for page_num in range(len(pdf)):
+                        try:
+                            page = pdf[page_num]
+                            textpage = page.get_textpage()
+                            page_text = textpage.get_text_range()
+                            textpage.close()
+                            page.close()
+                            if page_text.strip():
+                                text_parts.append(page_text)
+                        except Exception as e:
+                            logger.warning(f"Failed to extract text from page {page_num}: {str(e)}")
+                            continue
+                finally:
+                    pdf.close()
             
             if not text_parts:
                 raise ValueError("No text could be extracted from PDF")
@@ -111,44 +149,63 @@ class FileService:
     
     @staticmethod
     def _extract_docx_text(file_bytes: bytes) -> str:
-        """Extract text from Word document (.docx) file"""
+        """Extract text from Word document (.docx) file by reading word/document.xml directly"""
         try:
-            from docx import Document
-            
-            doc = Document(io.BytesIO(file_bytes))
-            text_parts = []
+            with zipfile.ZipFile(io.BytesIO(file_bytes)) as archive:
+                if archive.getinfo("word/document.xml").file_size > MAX_DOCX_XML_SIZE:
+                    raise ValueError("Word document content is too large")
+                # Uploaded XML is untrusted: no entity expansion, network fetches or huge trees.
+                # lxml parsers must not be shared across threads, so each extraction builds its own
+                parser = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=False)
+                with archive.open("word/document.xml") as document_xml:
+                    body = etree.parse(document_xml, parser).getroot().find(f"{_W}body")
             
-            # Extract text from paragraphs
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_parts.append(paragraph.text)
+            if body is None:
+                raise ValueError("Word document has no body")
             
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        text_parts.append(" | ".join(row_text))
+            paragraphs = []
+            tables = []
+            for element in body:
+                # Extract text from top-level paragraphs
+                if element.tag == f"{_W}p":
+                    text = FileService._docx_paragraph_text(element)
+                    if text.strip():
+                        paragraphs.append(text)
+                # Extract text from tables
+                elif element.tag == f"{_W}tbl":
+                    for row in element.iterchildren(f"{_W}tr"):
+                        row_text = []
+                        for cell in row.iterchildren(f"{_W}tc"):
+                            cell_text = "\n".join(
+                                FileService._docx_paragraph_text(p) for p in cell.iterchildren(f"{_W}p")
+                            ).strip()
+                            if cell_text:
+                                row_text.append(cell_text)
+                        if row_text:
+                            tables.append(" | ".join(row_text))
             
+            text_parts = paragraphs + tables
             if not text_parts:
                 raise ValueError("No text could be extracted from Word document")
             
             return "\n".join(text_parts)
             
-        except ImportError:
-            logger.error("python-docx library not installed")
-            raise ValueError("Word document processing not available - python-docx library required")
         except Exception as e:
             logger.error(f"Word document processing failed: {str(e)}")
             raise ValueError(f"Failed to process Word document: {str(e)}")
     
     @staticmethod
-    def generate_file_hash(content: str) -> str:
-        """Generate SHA-256 hash of file content for caching"""
-        return hashlib.sha256(content.encode()).hexdigest()
+    def _docx_paragraph_text(paragraph) -> str:
+        """Text of a w:p element, rendering tabs and breaks the way python-docx does"""
+        parts = []
+        for node in paragraph.iter(f"{_W}t", f"{_W}tab", f"{_W}br", f"{_W}cr"):
+            if node.tag == f"{_W}t":
+                parts.append(node.text or "")
+            elif node.tag == f"{_W}tab":
+                parts.append("\t")
+            else:
+                parts.append("\n")
+        return "".join(parts)
     
     @staticmethod
     def sanitize_filename(filename: str) -> str:
@@ -1,13 +1,18 @@
 from typing import Dict, Any, Optional, AsyncGenerator
 import logging
 import asyncio
-import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
 from app.workflows.graph import invoke_graph
+from app.workflows.state import LazyStateSummary
 from app.core.tracing import tracing_service
+from app.services.ai_service import ai_service
 from app.workflows.nodes import (
+    build_generation_prompt,
+    generator_model,
     input_validation_node,
-    resume_parser_node,
-    job_parser_node,
+    parse_inputs_node,
     relevance_matcher_node,
     cover_letter_generator_node,
     cover_letter_validator_node
@@ -15,56 +20,132 @@ from app.workflows.nodes import (
 
 logger = logging.getLogger(__name__)
 
+def _sse_frame(payload: Any, prefix: bytes = b"") -> bytes:
+    """Encode one SSE data frame, optionally tagged (e.g. b"TOKEN::")"""
+    return b"data: " + prefix + orjson.dumps(payload) + b"\n\n"
+
+# Fixed status frames, encoded once at import
+_SSE_VALIDATING = _sse_frame({"status": "Validating input..."})
+_SSE_PARSING = _sse_frame({"status": "Parsing resume and job description..."})
+_SSE_MATCHING = _sse_frame({"status": "Matching experiences..."})
+_SSE_GENERATING = _sse_frame({"status": "Generating cover letter..."})
+_SSE_VALIDATING_OUTPUT = _sse_frame({"status": "Validating output..."})
+_SSE_COMPLETED = _sse_frame({"status": "Workflow completed"})
+_SSE_INCOMPLETE = _sse_frame({"status": "incomplete"})
+_SSE_VALIDATION_FAILED = b"data: ERROR::Input validation failed\n\n"
+_SSE_DONE = b"data: done\n\n"
+
+# Graph runs take many seconds each; keep them off the default executor so they
+# cannot starve short to_thread work such as file extraction
+_GRAPH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.MAX_CONCURRENT_GRAPHS,
+    thread_name_prefix="graph"
+)
+
 class GraphService:
     """Service for orchestrating LangGraph workflows"""
     
     async def invoke_graph(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Invoke the LangGraph workflow asynchronously"""
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, invoke_graph, state)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_GRAPH_EXECUTOR, invoke_graph, state)
         return result
     
     async def invoke_graph_streaming(
         self, 
         state: Dict[str, Any]
-    ) -> AsyncGenerator[str, None]:
-        """Invoke the graph with streaming updates"""
+    ) -> AsyncGenerator[bytes, None]:
+        """Invoke the graph with streaming updates.
+
+        The pipeline runs as its own task and queues frames, so it keeps working
+        while the response is being written instead of waiting for each yield
+        to be consumed. The task is cancelled if the client goes away.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self._run_pipeline(state, queue))
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    break
+                yield frame
+            # Re-raise anything the pipeline failed with
+            await task
+        finally:
+            task.cancel()
+    
+    async def _run_pipeline(self, state: Dict[str, Any], queue: asyncio.Queue):
+        """Drive the streaming pipeline, queueing frames and a None sentinel at the end"""
+        try:
+            async for frame in self._pipeline_frames(state):
+                queue.put_nowait(frame)
+        finally:
+            queue.put_nowait(None)
+    
+    async def _pipeline_frames(self, state: Dict[str, Any]) -> AsyncGenerator[bytes, None]:
+        """Run the workflow step by step, yielding SSE frames as each step starts and ends"""
+        loop = asyncio.get_running_loop()
         # 1. Input validation
-        yield f"data: {json.dumps({'status': 'Validating input...'})}\n\n"
-        state = await asyncio.get_event_loop().run_in_executor(None, input_validation_node, state)
+        yield _SSE_VALIDATING
+        state = await loop.run_in_executor(_GRAPH_EXECUTOR, input_validation_node, state)
+        if state.get("validation_failed", False):
+            yield _sse_frame({'status': 'Input validation failed', 'error': state.get('validation_error', {})})
+            yield _SSE_VALIDATION_FAILED
+            yield _SSE_DONE
+            return
+        # 2-3. Parsing resume and job description (concurrently, inside the node)
+        yield _SSE_PARSING
+        state = await loop.run_in_executor(_GRAPH_EXECUTOR, parse_inputs_node, state)
         if state.get("validation_failed", False):
-            yield f"data: {json.dumps({'status': 'Input validation failed', 'error': state.get('validation_error', {})})}\n\n"
-            yield f"data: ERROR::Input validation failed\n\n"
-            yield "data: done\n\n"
+            yield _sse_frame({'status': 'Input validation failed', 'error': state['validation_error']})
+            yield _SSE_VALIDATION_FAILED
+            yield _SSE_DONE
             return
-        # 2. Parsing resume
-        yield f"data: {json.dumps({'status': 'Parsing resume...'})}\n\n"
-        state = await asyncio.get_event_loop().run_in_executor(None, resume_parser_node, state)
-        # 3. Parsing job description
-        yield f"data: {json.dumps({'status': 'Parsing job description...'})}\n\n"
-        state = await asyncio.get_event_loop().run_in_executor(None, job_parser_node, state)
         # 4. Matching experiences
-        yield f"data: {json.dumps({'status': 'Matching experiences...'})}\n\n"
-        state = await asyncio.get_event_loop().run_in_executor(None, relevance_matcher_node, state)
+        yield _SSE_MATCHING
+        state = await loop.run_in_executor(_GRAPH_EXECUTOR, relevance_matcher_node, state)
         # 5. Generating cover letter
-        yield f"data: {json.dumps({'status': 'Generating cover letter...'})}\n\n"
-        state = await asyncio.get_event_loop().run_in_executor(None, cover_letter_generator_node, state)
+        yield _SSE_GENERATING
+        # Forward tokens as they arrive so the letter appears at first-token latency
+        letter_parts = []
+        system, prompt = build_generation_prompt(state)
+        try:
+            async for delta in ai_service.stream_generate(
+                model_name=generator_model(state),
+                prompt=prompt,
+                system=system,
+                metadata={
+                    "operation": "cover_letter_generation",
+                    "matched_experiences_count": len(state["matched_experiences"])
+                }
+            ):
+                letter_parts.append(delta)
+                yield _sse_frame({'delta': delta}, b"TOKEN::")
+            state["cover_letter"] = "".join(letter_parts)
+        except Exception as e:
+            # Fall back to the buffered node (with retries); FINAL_COVER_LETTER replaces any partial text
+            logger.warning(f"Streaming generation failed, falling back to buffered generation: {str(e)}")
+            state = await loop.run_in_executor(_GRAPH_EXECUTOR, cover_letter_generator_node, state)
         # 6. Validating output
-        yield f"data: {json.dumps({'status': 'Validating output...'})}\n\n"
-        state = await asyncio.get_event_loop().run_in_executor(None, cover_letter_validator_node, state)
+        yield _SSE_VALIDATING_OUTPUT
+        state = await loop.run_in_executor(_GRAPH_EXECUTOR, cover_letter_validator_node, state)
         # 7. Workflow completed
-        yield f"data: {json.dumps({'status': 'Workflow completed'})}\n\n"
+        yield _SSE_COMPLETED
         # 8. Final result
         if "cover_letter" in state:
-            yield f"data: FINAL_COVER_LETTER::{json.dumps({'cover_letter': state['cover_letter']})}\n\n"
-            yield "data: done\n\n"
+            yield _sse_frame({'cover_letter': state['cover_letter']}, b"FINAL_COVER_LETTER::")
+            yield _SSE_DONE
         elif "error" in state:
             error_detail = state["error"].get("details", "Unknown error")
-            yield f"data: ERROR::{error_detail}\n\n"
-            yield "data: done\n\n"
+            yield f"data: ERROR::{error_detail}\n\n".encode()
+            yield _SSE_DONE
         else:
-            yield f"data: {json.dumps(state)}\n\n"
-            yield "data: done\n\n"
+            # Keep the (possibly large) state server-side; the client only needs to know the run is over
+            logger.warning("Streaming workflow ended without a cover letter or error",
+                           extra={"state_summary": LazyStateSummary(state)})
+            logger.debug("Incomplete workflow state: %s", state)
+            yield _SSE_INCOMPLETE
+            yield _SSE_DONE
     
     async def invoke_graph_with_feedback(
         self, 
@@ -74,14 +155,6 @@ class GraphService:
         feedback = state.get("user_feedback", "")
         current_letter = state.get("cover_letter", "")
         if feedback and current_letter:
-            feedback_prompt = f"""
-            Analyze the user feedback on this cover letter and provide suggestions for improvement.
-            Cover Letter:
-            {current_letter}
-            User Feedback:
-            {feedback}
-            Provide specific, actionable suggestions for improving the letter.
-            """
             state["feedback_processed"] = True
             state["feedback_analysis"] = {
                 "feedback_received": feedback,
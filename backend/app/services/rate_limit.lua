@@ -0,0 +1,18 @@
+-- Sliding-window rate limiter (sorted-set log), evaluated atomically in one round-trip.
+-- KEYS[1]  rate limit key for the client
+-- ARGV[1]  current time in milliseconds
+-- ARGV[2]  window length in milliseconds
+-- ARGV[3]  number of requests to record (batched by the caller)
+-- ARGV[4]  unique batch id used to build set members
+-- Returns the number of requests in the current window after recording.
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local count = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+for i = 1, count do
+    redis.call('ZADD', key, now, ARGV[4] .. ':' .. i)
+end
+redis.call('PEXPIRE', key, window)
+return redis.call('ZCARD', key)
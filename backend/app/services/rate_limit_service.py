@@ -0,0 +1,187 @@
+import redis
+import redis.asyncio as aioredis
+import asyncio
+import logging
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCRIPT_PATH = Path(__file__).with_name("rate_limit.lua")
+FLUSH_INTERVAL_SECONDS = 0.02  # 20 ms
+
+
+class LocalCounter:
+    """Per-worker pending request counts, flushed to Redis in batches.
+
+    Drained counts stay in in_flight until their flush settles, so requests
+    sent to Redis but not yet reflected in a snapshot are still counted.
+    Every mutation runs on the event loop thread with no await in between,
+    so no lock is needed around the dicts.
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, int] = {}
+        self.in_flight: Dict[str, int] = {}
+
+    def increment(self, client_id: str):
+        self.pending[client_id] = self.pending.get(client_id, 0) + 1
+
+    def outstanding(self, client_id: str) -> int:
+        """Requests counted locally that the client's snapshot does not include yet"""
+        return self.pending.get(client_id, 0) + self.in_flight.get(client_id, 0)
+
+    def drain(self) -> Dict[str, int]:
+        """Take all pending counts for a flush, holding them as in flight until settle"""
+        batch, self.pending = self.pending, {}
+        for client_id, count in batch.items():
+            self.in_flight[client_id] = self.in_flight.get(client_id, 0) + count
+        return batch
+
+    def settle(self, batch: Dict[str, int]):
+        """Release a drained batch once its flush result has replaced the snapshots, or it was restored"""
+        for client_id, count in batch.items():
+            remaining = self.in_flight.get(client_id, 0) - count
+            if remaining > 0:
+                self.in_flight[client_id] = remaining
+            else:
+                self.in_flight.pop(client_id, None)
+
+    def restore(self, batch: Dict[str, int]):
+        """Put back counts from a flush that failed"""
+        for client_id, count in batch.items():
+            self.pending[client_id] = self.pending.get(client_id, 0) + count
+
+
+class RateLimitService:
+    """Redis sliding-window rate limiter shared across workers. Fails open if Redis is unavailable.
+
+    Allowed requests are only counted locally; a background task flushes the
+    counts to Redis every FLUSH_INTERVAL_SECONDS and keeps the last known
+    window total per client, so the hot path makes no Redis round-trip.
+    Redis is consulted synchronously only for a client's first request in a
+    window or when the local estimate says it is over the limit. Because other workers' requests become visible
+    only after their next flush, a burst of up to one flush interval per
+    worker can exceed the limit.
+    """
+
+    def __init__(self, limit: int, window_seconds: int = 60):
+        self.limit = limit
+        self.window_ms = window_seconds * 1000
+        self.redis_client: Optional[aioredis.Redis] = None
+        self.counter = LocalCounter()
+        self._snapshots: Dict[str, Tuple[int, int]] = {}  # client_id -> (window total, as-of ms)
+        self._script = _SCRIPT_PATH.read_text()
+        self._sha: Optional[str] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._available = False
+
+    async def initialize(self):
+        """Connect to Redis, load the Lua script once and start the flush loop"""
+        try:
+            self.redis_client = aioredis.from_url(
+                settings.REDIS_URL,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+            self._sha = await self.redis_client.script_load(self._script)
+            self._available = True
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            logger.info("Rate limiter initialized (Redis connected)")
+        except Exception as e:
+            logger.warning("Rate limiter Redis connection failed (rate limiting disabled): %s", str(e))
+            self.redis_client = None
+            self._available = False
+
+    async def close(self):
+        """Flush outstanding counts and close the Redis connection"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            await self._flush()
+        if self.redis_client:
+            await self.redis_client.close()
+
+    def _key(self, client_id: str) -> str:
+        return f"ratelimit:{client_id}"
+
+    async def is_allowed(self, client_id: str) -> bool:
+        """Count a request for the client and report whether it is within the limit"""
+        if not self._available or not self.redis_client:
+            return True
+
+        snapshot = self._snapshots.get(client_id)
+        if snapshot is not None and snapshot[0] + self.counter.outstanding(client_id) < self.limit:
+            self.counter.increment(client_id)
+            return True
+
+        # Unknown client or local estimate over the limit; read the live window from Redis
+        now_ms = int(time.time() * 1000)
+        try:
+            total = await self.redis_client.zcount(self._key(client_id), now_ms - self.window_ms, "+inf")
+        except redis.RedisError as e:
+            logger.warning(f"Rate limit check failed for {client_id}: {str(e)}")
+            return True
+
+        self._snapshots[client_id] = (total, now_ms)
+        if total + self.counter.outstanding(client_id) < self.limit:
+            self.counter.increment(client_id)
+            return True
+        return False
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+            await self._flush()
+
+    async def _flush(self):
+        """Record pending counts in Redis with one pipelined round-trip"""
+        now_ms = int(time.time() * 1000)
+        # Drop snapshots older than the window so idle clients do not accumulate
+        expired = [cid for cid, (_, as_of) in self._snapshots.items() if now_ms - as_of >= self.window_ms]
+        for client_id in expired:
+            del self._snapshots[client_id]
+
+        batch = self.counter.drain()
+        if not batch or not self.redis_client:
+            return
+
+        batch_id = f"{now_ms}:{uuid.uuid4().hex}"
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for client_id, count in batch.items():
+                    pipe.evalsha(self._sha, 1, self._key(client_id), now_ms, self.window_ms, count, batch_id)
+                totals = await pipe.execute()
+        except redis.exceptions.NoScriptError:
+            # Script cache was flushed (e.g. Redis restart); reload and retry on the next tick
+            self.counter.settle(batch)
+            self.counter.restore(batch)
+            try:
+                self._sha = await self.redis_client.script_load(self._script)
+            except redis.RedisError as e:
+                logger.warning(f"Rate limit script reload failed: {str(e)}")
+            return
+        except redis.RedisError as e:
+            logger.warning(f"Rate limit flush failed: {str(e)}")
+            self.counter.settle(batch)
+            self.counter.restore(batch)
+            return
+        except asyncio.CancelledError:
+            # Cancelled mid-flight (shutdown); put the counts back for close() to flush
+            self.counter.settle(batch)
+            self.counter.restore(batch)
+            raise
+
+        # The new totals include this batch, so it stops counting as in flight in the same step
+        for client_id, total in zip(batch, totals):
+            self._snapshots[client_id] = (int(total), now_ms)
+        self.counter.settle(batch)
+
+# Global rate limit service instance
+rate_limit_service = RateLimitService(limit=settings.RATE_LIMIT_PER_MINUTE)
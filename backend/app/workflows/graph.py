@@ -1,18 +1,25 @@
 from langgraph.graph import StateGraph
 from typing import Dict, Any
+import functools
 import logging
-from .state import CoverLetterState, StateValidator
+from .state import CoverLetterState, StateValidator, LazyStateSummary
 from .nodes import (
     input_validation_node,
-    resume_parser_node,
-    job_parser_node,
+    parse_inputs_node,
     relevance_matcher_node,
     cover_letter_generator_node,
-    cover_letter_validator_node
+    cover_letter_validator_node,
+    speculative_validator_node,
+    adopt_draft_node
 )
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Revision loop budget: drafts validated per request, and the score gain a rewrite must show to earn another
+MAX_LETTER_DRAFTS = 3
+MIN_SCORE_GAIN = 0.05
+
 def create_cover_letter_graph() -> StateGraph:
     """Create and configure the LangGraph workflow for cover letter generation"""
     
@@ -21,11 +28,15 @@ def create_cover_letter_graph() -> StateGraph:
     
     # Add all nodes to the graph
     graph.add_node("validate_input", input_validation_node)
-    graph.add_node("parse_resume", resume_parser_node)
-    graph.add_node("parse_job", job_parser_node)
+    graph.add_node("parse_inputs", parse_inputs_node)
     graph.add_node("match_experiences", relevance_matcher_node)
     graph.add_node("generate_letter", cover_letter_generator_node)
-    graph.add_node("validate_letter", cover_letter_validator_node)
+    if settings.SPECULATIVE_RETRIES:
+        graph.add_node("validate_letter", speculative_validator_node)
+        graph.add_node("adopt_draft", adopt_draft_node)
+        graph.add_edge("adopt_draft", "validate_letter")
+    else:
+        graph.add_node("validate_letter", cover_letter_validator_node)
     
     # Add error handling and finish nodes
     graph.add_node("error_handler", error_handler_node)
@@ -39,26 +50,14 @@ def create_cover_letter_graph() -> StateGraph:
         """Route based on input validation results"""
         if state.get("validation_failed", False):
             return "error_handler"
-        return "parse_resume"
+        return "parse_inputs"
     
     def parsing_branch(state: Dict[str, Any]) -> str:
-        """Route after parsing is complete"""
-        if "resume_info" in state:
-            return "parse_job"
-        return "error_handler"
-    
-    def job_parsing_branch(state: Dict[str, Any]) -> str:
-        """Route after job parsing"""
-        if "job_info" in state:
+        """Single post-parse decision; the parsers also rule on whether each document is valid"""
+        if "resume_info" in state and "job_info" in state and not state.get("validation_failed", False):
             return "match_experiences"
         return "error_handler"
     
-    def matching_branch(state: Dict[str, Any]) -> str:
-        """Route after experience matching"""
-        if "matched_experiences" in state:
-            return "generate_letter"
-        return "error_handler"
-    
     def validation_branch(state: Dict[str, Any]) -> str:
         """Route based on cover letter validation results"""
         validation_result = state.get("validation_result", {})
@@ -67,12 +66,21 @@ def create_cover_letter_graph() -> StateGraph:
             # Letter is valid, we're done
             return "finish"
         else:
-            # Letter needs revision, try again
-            # Check if we've tried too many times
-            prior_issues = state.get("prior_issues", [])
-            if len(prior_issues) >= 3:  # Max 3 attempts
+            # Letter needs revision, try again unless the budget is spent or rewrites stopped helping
+            if state.get("revision_count", 0) >= MAX_LETTER_DRAFTS:
                 logger.warning("Max validation attempts reached")
                 return "finish"
+            score = validation_result.get("score")
+            prior_score = state.get("prior_score")
+            if (
+                isinstance(score, (int, float))
+                and isinstance(prior_score, (int, float))
+                and score - prior_score < MIN_SCORE_GAIN
+            ):
+                logger.warning(f"Revision did not improve the letter ({prior_score} -> {score}), stopping")
+                return "finish"
+            if state.get("speculative_letter"):
+                return "adopt_draft"
             return "generate_letter"
     
     # Add conditional edges
@@ -81,47 +89,34 @@ def create_cover_letter_graph() -> StateGraph:
         input_validation_branch,
         {
             "error_handler": "error_handler",
-            "parse_resume": "parse_resume"
+            "parse_inputs": "parse_inputs"
         }
     )
     
     graph.add_conditional_edges(
-        "parse_resume",
+        "parse_inputs",
         parsing_branch,
-        {
-            "parse_job": "parse_job",
-            "error_handler": "error_handler"
-        }
-    )
-    
-    graph.add_conditional_edges(
-        "parse_job",
-        job_parsing_branch,
         {
             "match_experiences": "match_experiences",
             "error_handler": "error_handler"
         }
     )
     
-    graph.add_conditional_edges(
-        "match_experiences",
-        matching_branch,
-        {
-            "generate_letter": "generate_letter",
-            "error_handler": "error_handler"
-        }
-    )
-    
+    validation_routes = {
+        "finish": "finish",
+        "generate_letter": "generate_letter"
+    }
+    if settings.SPECULATIVE_RETRIES:
+        validation_routes["adopt_draft"] = "adopt_draft"
     graph.add_conditional_edges(
         "validate_letter",
         validation_branch,
-        {
-            "finish": "finish",
-            "generate_letter": "generate_letter"
-        }
+        validation_routes
     )
     
-    # Add regular edges for sequential flow
+    # Add regular edges for sequential flow; the matcher always writes its output
+    # key (falling back on failure), so this needs no branch
+    graph.add_edge("match_experiences", "generate_letter")
     graph.add_edge("generate_letter", "validate_letter")
     
     # Set finish points
@@ -133,20 +128,35 @@ def create_cover_letter_graph() -> StateGraph:
 def error_handler_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Handle errors in the workflow"""
     import traceback
-    logger.error("Workflow error occurred in error_handler_node", extra={"state": StateValidator.get_state_summary(state)})
-    logger.error(f"Full state at error: {state}")
+    # The summary goes into the error payload anyway, so build it once for both
+    state_summary = StateValidator.get_state_summary(state)
+    logger.error("Workflow error occurred in error_handler_node", extra={"state": state_summary})
+    logger.debug("Full state at error: %s", state)
     # Add error information to state
     state["error"] = {
         "message": "Workflow execution failed",
         "validation_failed": state.get("validation_failed", False),
         "validation_error": state.get("validation_error", {}),
-        "state_summary": StateValidator.get_state_summary(state)
+        "state_summary": state_summary
     }
     return state
 
 def finish_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Final node that marks successful completion"""
-    logger.info("Workflow completed successfully", extra={"state": StateValidator.get_state_summary(state)})
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Workflow completed successfully", extra={"state": LazyStateSummary(state)})
+    
+    # A revision loop that stopped on a rejected draft returns the best one it validated
+    validation_result = state.get("validation_result", {})
+    best_score = state.get("best_score")
+    score = validation_result.get("score")
+    if (
+        not validation_result.get("valid", False)
+        and state.get("best_letter")
+        and not (isinstance(score, (int, float)) and score >= best_score)
+    ):
+        logger.warning(f"Returning the best-scoring draft ({best_score}) over the last one ({score})")
+        state["cover_letter"] = state["best_letter"]
     
     # Add completion metadata
     state["workflow_completed"] = True
@@ -154,8 +164,10 @@ def finish_node(state: Dict[str, Any]) -> Dict[str, Any]:
     
     return state
 
-# Create the compiled graph instance
-app_graph = create_cover_letter_graph()
+@functools.cache
+def get_graph():
+    """Compile the workflow on first use and reuse it afterwards"""
+    return create_cover_letter_graph()
 
 def invoke_graph(state: Dict[str, Any]) -> Dict[str, Any]:
     """Invoke the graph with proper error handling and logging"""
@@ -164,11 +176,12 @@ def invoke_graph(state: Dict[str, Any]) -> Dict[str, Any]:
         if not StateValidator.validate_initial_state(state):
             raise ValueError("Invalid initial state")
         
-        logger.info("Starting cover letter generation workflow", 
-                   extra={"state_summary": StateValidator.get_state_summary(state)})
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Starting cover letter generation workflow",
+                       extra={"state_summary": LazyStateSummary(state)})
         
         # Invoke the graph
-        result = app_graph.invoke(state)
+        result = get_graph().invoke(state)
         
         # Add generation metadata
         result["generation_metadata"] = {
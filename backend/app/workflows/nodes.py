@@ -1,88 +1,192 @@
-from typing import Dict, Any
-import json
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import orjson
 import logging
+from app.core.config import TONE_DESCRIPTIONS, settings
 from app.core.tracing import tracing_service
 from app.services.ai_service import ai_service
-from app.models.schemas import ValidationResult
+from app.models.schemas import MatchingResult, ValidationResult
 
 logger = logging.getLogger(__name__)
 
+# Speculative drafts run beside the validator, one per in-flight graph at most
+_SPECULATIVE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.MAX_CONCURRENT_GRAPHS,
+    thread_name_prefix="speculative"
+)
+
+# Job parses run beside the resume parse, one per in-flight graph at most
+_PARSE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.MAX_CONCURRENT_GRAPHS,
+    thread_name_prefix="parse"
+)
+
+def _dumps(obj: Any) -> str:
+    """Compact JSON for prompts with orjson; indentation only adds tokens (non-ASCII stays as UTF-8 rather than escapes)"""
+    return orjson.dumps(obj).decode()
+
+def _clip(text: str, max_len: int) -> str:
+    return text if len(text) <= max_len else text[:max_len].rstrip() + "..."
+
+def _compact_resume(info: Dict[str, Any], max_items: int = 5, max_desc: int = 400, max_skills: int = 30) -> Dict[str, Any]:
+    """Bound the resume payload sent to the LLM: first max_items entries (resumes list the most recent first), clipped fields"""
+    compact = dict(info)
+    for key in ("experience", "education"):
+        items = compact.get(key)
+        if isinstance(items, list):
+            compact[key] = [
+                {k: _clip(v, max_desc) if isinstance(v, str) else v for k, v in item.items()}
+                if isinstance(item, dict) else item
+                for item in items[:max_items]
+            ]
+    if isinstance(compact.get("skills"), list):
+        compact["skills"] = compact["skills"][:max_skills]
+    if isinstance(compact.get("summary"), str):
+        compact["summary"] = _clip(compact["summary"], max_desc)
+    return compact
+
+def _compact_job(info: Dict[str, Any], max_items: int = 10, max_len: int = 300) -> Dict[str, Any]:
+    """Bound the job payload sent to the LLM: first max_items entries of each list, clipped strings"""
+    compact = dict(info)
+    for key in ("requirements", "responsibilities", "qualifications"):
+        items = compact.get(key)
+        if isinstance(items, list):
+            compact[key] = [_clip(item, max_len) if isinstance(item, str) else item for item in items[:max_items]]
+    return compact
+
+def _log_compaction(operation: str, original: Dict[str, Any], compact: Dict[str, Any], compact_json: str):
+    """Log estimated prompt tokens (~4 chars each) saved by compaction"""
+    if logger.isEnabledFor(logging.DEBUG) and compact != original:
+        logger.debug(f"{operation}: compacted payload ~{len(_dumps(original)) // 4} -> ~{len(compact_json) // 4} tokens")
+
+# Static system prompts, sent byte-identical on every call so Anthropic serves them from its
+# prompt cache; each node puts only its dynamic payload in the user message
+_MATCHER_SYSTEM = """You are an expert at matching candidate experiences to job requirements.
+
+Analyze the resume experiences and job requirements to find the best matches. Focus on transferable skills and relevant experience.
+
+Return ONLY a JSON object with this structure:
+{
+  "matched_experiences": [
+    {
+      "experience_type": "work|education|project",
+      "title": "string",
+      "description": "string", 
+      "relevance_score": 0.0-1.0,
+      "transferable_skills": ["skill1", "skill2"]
+    }
+  ]
+}
+
+Prioritize experiences that demonstrate transferable skills relevant to the job requirements."""
+
+_VALIDATOR_SYSTEM = """You are a very strict and intelligent QA assistant for AI-generated cover letters.
+
+Evaluate the letter using these criteria:
+
+1. **HONESTY AND TRUTHFULNESS** — Does the letter honestly represent the candidate's experience without ANY fabrication, exaggeration, or hallucination? Even minor exaggerations, vague claims, or made-up details should be flagged.
+2. **Company and Job Mention** — Does it clearly mention the company name and job title?
+3. **Transferable Skills Focus** — Does it effectively connect the candidate's background to the job through specific, concrete transferable skills? Generic or overly flattering language should be flagged.
+4. **Tone and Professionalism** — Is the tone appropriate, professional, and confident? Letters that are too generic, overly flattering, or lack specific, relevant details should be rejected.
+5. **Length and Structure** — Is it well-structured and appropriately sized (250-350 words)? Letters that are too short, too long, or poorly structured should be rejected.
+6. **NO SELF-DISQUALIFYING OR FLAW-HIGHLIGHTING LANGUAGE** — REJECT any letter that includes language about flaws, gaps, self-doubt, or underconfidence (e.g., "While I am still developing...", "Although I lack...", "I am early in my career", "I have limited experience in..."). The letter should focus on strengths and achievements.
+7. **TRANSFERABLE SKILLS ARE ACCEPTABLE** — If there are no direct experience matches, it is acceptable for the letter to focus on transferable skills or general strengths from the resume, as long as it does not fabricate or exaggerate. Only reject if the letter fabricates, exaggerates, or is completely irrelevant.
+
+Return a JSON object with:
+- "valid": true or false
+- "issues": list of concrete problems if found
+- "score": quality score from 0.0 to 1.0
+
+**STRICT HONESTY RULES**:
+- **REJECT letters** that make ANY false, exaggerated, or hallucinated claims about experience, skills, or qualifications
+- **REJECT letters** that are generic, vague, or lack specific, relevant details
+- **REJECT letters** that use overly flattering or flowery language without evidence
+- **REJECT letters** that include self-disqualifying, flaw-highlighting, or underconfident language
+- **ACCEPT letters** that are honest, specific, and focused on transferable skills and strengths, even if there are no direct experience matches
+- **PRIORITIZE HONESTY AND SPECIFICITY OVER PERFECTION** — A truthful, specific letter with gaps is better than a generic or fabricated perfect letter"""
+
+# Per-request details (user_name, tone, job, matches) follow in a second system block
+_GENERATOR_SYSTEM = """You are a professional writing agent specialized in generating high-quality, concise, and direct cover letters.
+
+Write a 250–350 word cover letter using the information provided.
+
+Requirements:
+1. Begin with a formal greeting: e.g., "Dear [Team/Manager] at {company}".
+2. Intro paragraph: state the job title, company name, and express clear enthusiasm.
+3. Body: highlight 1–2 key experiences that demonstrate **transferable skills** applicable to this role.
+4. Closing: reinforce interest, connect to the company's mission, and invite further discussion.
+5. End with: "Sincerely," followed by the candidate name given below
+
+**STRICT GUIDELINES:**
+- **NEVER fabricate, invent, or stretch experience** — only use information that is explicitly provided. Do not hallucinate or make up any experience, skills, or qualifications.
+- **If there are no direct experience matches, write an honest cover letter that highlights any transferable skills, strengths, or relevant qualities from the resume that could apply to the job. Do your best to connect the candidate's real background to the job requirements.**
+- **Do NOT include language that highlights flaws, gaps, or self-doubt** (e.g., "While I am still developing...", "Although I lack...", "I am early in my career", "I have limited experience in...").
+- **Do NOT include self-disqualifying or underconfident language**. Focus on strengths, achievements, and readiness.
+- **Be completely truthful and specific** about the candidate's actual experience and skills.
+- **Focus on transferable skills** — Show how existing experience applies to the new role.
+- **Be specific about skills** — Programming, analysis, teamwork, communication, etc.
+- **Highlight learning ability** — Demonstrate adaptability and growth mindset, but only if supported by the resume.
+- **Use concrete examples** — Reference specific projects, courses, or experiences from the resume.
+- **Maintain the tone given below throughout**
+- **Be concise and direct, avoiding flowery language**
+- **Emphasize potential and transferability** rather than direct experience matches
+- **PRIORITIZE HONESTY OVER PERFECTION** — It's better to be honest about limitations than to fabricate experience
+
+**CONFIDENCE AND TONE GUIDELINES:**
+- **Always present the candidate in a confident, positive light**
+- **Do not include language that downplays abilities or suggests unqualification**
+- **Avoid phrases like "While I am still developing..." or "Although I lack..."**
+- **If mentioning skills that are being developed, frame them as strengths or evidence of adaptability**
+- **Focus on what the candidate CAN do and WILL contribute, not what they cannot do**
+- **Use language that shows eagerness to learn and grow, not inadequacy**
+- **Maintain enthusiasm and conviction throughout the letter**"""
+
+# Real resumes and job posts are mostly prose; below this share of letters among the
+# non-whitespace characters the text is extraction noise, code or symbol dumps, and the
+# parser calls can be skipped. Whitespace is left out so layout padding from PDF
+# extraction does not dilute the ratio
+_MIN_DOCUMENT_CHARS = 100
+_MIN_ALPHA_RATIO = 0.5
+
+def document_issues(text: str, label: str) -> List[str]:
+    """Deterministic checks for text that cannot be a real document"""
+    text = text.strip()
+    if len(text) < _MIN_DOCUMENT_CHARS:
+        return [f"{label} too short"]
+    visible = sum(not c.isspace() for c in text)
+    if sum(map(str.isalpha, text)) / visible < _MIN_ALPHA_RATIO:
+        return [f"{label} does not look like readable text"]
+    return []
+
 @tracing_service.trace_node("input_validation")
 def input_validation_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Validate input documents are legitimate resumes and job descriptions"""
+    """Reject inputs that cannot be real documents; content checks are folded into the parser calls"""
     
-    resume_text = state["resume_posting"]
-    job_posting = state["job_posting"]
+    resume_issues = document_issues(state["resume_posting"], "Resume")
+    job_issues = document_issues(state["job_posting"], "Job description")
     
-    # Basic length check first
-    if len(resume_text.strip()) < 100 or len(job_posting.strip()) < 100:
+    if resume_issues or job_issues:
         state["validation_failed"] = True
         state["validation_error"] = {
-            "resume_issues": ["Resume too short"] if len(resume_text.strip()) < 100 else [],
-            "job_issues": ["Job description too short"] if len(job_posting.strip()) < 100 else []
+            "resume_issues": resume_issues,
+            "job_issues": job_issues
         }
-        return state
     
-    system_prompt = """You are a quality control assistant that validates whether uploaded documents are legitimate resumes and job descriptions.
+    return state
 
-Return ONLY a JSON object with this structure:
-{
-  "resume_valid": true/false,
-  "job_valid": true/false,
-  "resume_issues": ["list of specific problems with resume, if any"],
-  "job_issues": ["list of specific problems with job description, if any"]
-}
-
-**Resume Validation Criteria (BE LENIENT):**
-- Contains personal information (name, contact details) OR work experience/education/skills
-- Is not obviously random text, code, or completely unrelated content
-- Has reasonable length (at least 100 characters)
-- Accept various formats: bullet points, paragraphs, tables, etc.
-- Accept resumes with different structures and styles
-
-**Job Description Validation Criteria (BE LENIENT):**
-- Contains job-related information (title, company, requirements, responsibilities, etc.)
-- Is not obviously random text, code, or completely unrelated content
-- Has reasonable length (at least 100 characters)
-- Accept various formats: formal job postings, informal descriptions, etc.
-- Accept job descriptions with administrative text, application instructions, etc.
-
-**BE GENEROUS AND LENIENT** - Only reject if the content is clearly not a resume or job description (like random text, code, or completely unrelated content). If in doubt, mark as valid."""
-    
-    prompt = f"{system_prompt}\n\n### Resume Text:\n{resume_text[:2000]}...\n\n### Job Description Text:\n{job_posting[:2000]}..."
-    
-    try:
-        response = ai_service.invoke_with_retry(
-            model_name="claude-3-5-haiku",
-            prompt=prompt,
-            metadata={"operation": "input_validation"}
-        )
-        
-        validation_data = ai_service._parse_json_response(response)
-        
-        state["input_validation"] = validation_data
-        
-        # Check if validation failed
-        if not validation_data.get("resume_valid", False) or not validation_data.get("job_valid", False):
-            state["validation_failed"] = True
-            state["validation_error"] = {
-                "resume_issues": validation_data.get("resume_issues", []),
-                "job_issues": validation_data.get("job_issues", [])
-            }
-        
-        return state
-        
-    except Exception as e:
-        logger.error(f"Input validation failed: {str(e)}")
-        # If AI validation fails, be lenient and accept the input
-        logger.info("AI validation failed, accepting input as valid")
-        state["input_validation"] = {
-            "resume_valid": True,
-            "job_valid": True,
-            "resume_issues": [],
-            "job_issues": []
-        }
-        return state
+def _apply_parse_validation(state: Dict[str, Any], parsed: Dict[str, Any], issues_key: str) -> Dict[str, Any]:
+    """Strip the parser's valid/issues verdict from parsed data, flagging the state if the document was rejected"""
+    parsed = dict(parsed)
+    # Entries cached before the verdict was added have no "valid" key and count as valid
+    valid = parsed.pop("valid", True)
+    issues = parsed.pop("issues", [])
+    if valid is False:
+        state["validation_failed"] = True
+        validation_error = state.setdefault("validation_error", {"resume_issues": [], "job_issues": []})
+        validation_error[issues_key] = issues or ["Document does not appear to be valid"]
+    return parsed
 
 @tracing_service.trace_node("resume_parser")
 def resume_parser_node(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -91,7 +195,9 @@ def resume_parser_node(state: Dict[str, Any]) -> Dict[str, Any]:
     resume_text = state["resume_posting"]
     
     try:
-        parsed_resume = ai_service.parse_resume(resume_text)
+        # Reuse resume info already provided by the caller (cache hit or up-front parse)
+        parsed_resume = state.get("resume_info") or ai_service.parse_resume(resume_text)
+        parsed_resume = _apply_parse_validation(state, parsed_resume, "resume_issues")
         state["resume_info"] = parsed_resume
         
         # Extract user name for personalization
@@ -101,7 +207,7 @@ def resume_parser_node(state: Dict[str, Any]) -> Dict[str, Any]:
         return state
         
     except Exception as e:
-        logger.error(f"Resume parsing failed: {str(e)}")
+        logger.exception(f"Resume parsing failed: {str(e)}")
         # Provide fallback data
         state["resume_info"] = {
             "name": "Candidate",
@@ -117,8 +223,9 @@ def job_parser_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Parse job description into structured data"""
     job_text = state["job_posting"]
     try:
-        parsed_job = ai_service.parse_job(job_text)
-        logger.info(f"job_parser_node: parsed_job = {parsed_job}")
+        # Reuse job info already provided by the caller (cache hit or up-front parse)
+        parsed_job = state.get("job_info") or ai_service.parse_job(job_text)
+        logger.debug("job_parser_node: parsed_job = %s", parsed_job)
         if not parsed_job or not isinstance(parsed_job, dict):
             logger.error("job_parser_node: parse_job returned None or invalid data")
             # Provide fallback data
@@ -129,10 +236,10 @@ def job_parser_node(state: Dict[str, Any]) -> Dict[str, Any]:
                 "responsibilities": []
             }
         else:
-            state["job_info"] = parsed_job
+            state["job_info"] = _apply_parse_validation(state, parsed_job, "job_issues")
         return state
     except Exception as e:
-        logger.error(f"Job parsing failed: {str(e)}")
+        logger.exception(f"Job parsing failed: {str(e)}")
         # Provide fallback data
         state["job_info"] = {
             "title": "Position",
@@ -142,106 +249,138 @@ def job_parser_node(state: Dict[str, Any]) -> Dict[str, Any]:
         }
         return state
 
+def parse_inputs_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the resume and job parsers concurrently and merge their results.
+
+    The parsers are independent LLM calls, so each works on a shallow copy and
+    only the keys it writes are merged back.
+    """
+    job_future = _PARSE_EXECUTOR.submit(contextvars.copy_context().run, job_parser_node, dict(state))
+    resume_state = resume_parser_node(dict(state))
+    job_state = job_future.result()
+
+    state["resume_info"] = resume_state["resume_info"]
+    if "user_name" in resume_state:
+        state["user_name"] = resume_state["user_name"]
+    state["job_info"] = job_state["job_info"]
+
+    # The parsers also rule on whether each document is legitimate
+    if resume_state.get("validation_failed") or job_state.get("validation_failed"):
+        state["validation_failed"] = True
+        state["validation_error"] = {
+            "resume_issues": resume_state.get("validation_error", {}).get("resume_issues", []),
+            "job_issues": job_state.get("validation_error", {}).get("job_issues", [])
+        }
+    return state
+
+# Below this best relevance score the Haiku match is retried on Sonnet
+_WEAK_MATCH_SCORE = 0.3
+
+def _match_experiences(prompt: str, model_name: str) -> List[Dict[str, Any]]:
+    """Run the matcher prompt on one model and return its matched experiences"""
+    response = ai_service.invoke_with_retry(
+        model_name=model_name,
+        prompt=prompt,
+        system=_MATCHER_SYSTEM,
+        cache_ttl=settings.LLM_RESPONSE_CACHE_TTL,
+        output_schema=MatchingResult,
+        metadata={"operation": "relevance_matching"}
+    )
+    return ai_service._parse_json_response(response).get("matched_experiences", [])
+
+def _has_matchable_entries(resume_info: Dict[str, Any]) -> bool:
+    """With no experience or education entries there is nothing to match (this includes
+    the parser's fallback data), so the LLM call is skipped rather than invite invented entries"""
+    return bool(resume_info.get("experience") or resume_info.get("education"))
+
+def _weak_match(matched: List[Dict[str, Any]]) -> bool:
+    """Whether a match result is empty or scores every experience below _WEAK_MATCH_SCORE"""
+    scores = [item.get("relevance_score") for item in matched if isinstance(item, dict)]
+    return not any(isinstance(score, (int, float)) and score >= _WEAK_MATCH_SCORE for score in scores)
+
+def _compact_job_json(job_info: Dict[str, Any]) -> str:
+    """Serialize the compacted job payload for prompts"""
+    compact_job = _compact_job(job_info)
+    job_json = _dumps(compact_job)
+    _log_compaction("job", job_info, compact_job, job_json)
+    return job_json
+
+def _job_json(state: Dict[str, Any]) -> str:
+    """Compact job JSON, serialized once per run and shared by the matcher, generator and validator"""
+    job_json = state.get("job_info_json")
+    if job_json is None:
+        job_json = state["job_info_json"] = _compact_job_json(state["job_info"])
+    return job_json
+
+def _matcher_prompt(resume_info: Dict[str, Any], job_json: str) -> str:
+    """Build the matcher user message (sent with _MATCHER_SYSTEM)"""
+    compact_resume = _compact_resume(resume_info)
+    resume_json = _dumps(compact_resume)
+    _log_compaction("relevance_matching resume", resume_info, compact_resume, resume_json)
+    return "".join(("### Resume Info:\n", resume_json, "\n\n### Job Info:\n", job_json))
+
 @tracing_service.trace_node("relevance_matcher")
 def relevance_matcher_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Match resume experiences to job requirements"""
     
     resume_info = state["resume_info"]
-    job_info = state["job_info"]
     
-    system_prompt = """You are an expert at matching candidate experiences to job requirements.
-
-Analyze the resume experiences and job requirements to find the best matches. Focus on transferable skills and relevant experience.
-
-Return ONLY a JSON object with this structure:
-{
-  "matched_experiences": [
-    {
-      "experience_type": "work|education|project",
-      "title": "string",
-      "description": "string", 
-      "relevance_score": 0.0-1.0,
-      "transferable_skills": ["skill1", "skill2"]
-    }
-  ]
-}
-
-Prioritize experiences that demonstrate transferable skills relevant to the job requirements."""
+    if not _has_matchable_entries(resume_info):
+        logger.info("Resume has no experience or education entries, skipping relevance matching")
+        state["matched_experiences"] = []
+        return state
     
-    prompt = f"{system_prompt}\n\n### Resume Info:\n{json.dumps(resume_info, indent=2)}\n\n### Job Info:\n{json.dumps(job_info, indent=2)}"
+    prompt = _matcher_prompt(resume_info, _job_json(state))
     
     try:
-        response = ai_service.invoke_with_retry(
-            model_name="claude-3-7-sonnet",
-            prompt=prompt,
-            metadata={"operation": "relevance_matching"}
-        )
-        
-        matching_data = ai_service._parse_json_response(response)
-        state["matched_experiences"] = matching_data.get("matched_experiences", [])
+        # Matching over pre-parsed JSON is within Haiku's reach; weak results get one Sonnet retry
+        try:
+            matched = _match_experiences(prompt, "claude-3-5-haiku")
+        except Exception as e:
+            # Unparseable JSON or a Haiku API failure (after retries) counts as a weak match
+            logger.warning(f"Haiku relevance matching failed: {str(e)}")
+            matched = []
+        if _weak_match(matched):
+            logger.info("Haiku match was weak, retrying relevance matching on Sonnet")
+            matched = _match_experiences(prompt, "claude-3-7-sonnet")
+        state["matched_experiences"] = matched
         
         return state
         
     except Exception as e:
-        logger.error(f"Relevance matching failed: {str(e)}")
+        logger.exception(f"Relevance matching failed: {str(e)}")
         state["matched_experiences"] = []
         return state
 
+# Letters are written on Sonnet; once the validator raises this many issues the rewrite escalates to Opus
+_DEFAULT_GENERATOR_MODEL = "claude-3-7-sonnet"
+_ESCALATION_GENERATOR_MODEL = "claude-opus-4"
+_ESCALATE_AFTER_ISSUES = 2
+
+def generator_model(state: Dict[str, Any]) -> str:
+    """Pick the letter model: the per-request choice if any, else Sonnet with escalation to Opus.
+
+    Always the letter variant, so every draft gets the letter token cap and temperature.
+    """
+    model_name = state.get("generator_model")
+    if not model_name:
+        escalate = len(state.get("prior_issues") or []) >= _ESCALATE_AFTER_ISSUES
+        model_name = _ESCALATION_GENERATOR_MODEL if escalate else _DEFAULT_GENERATOR_MODEL
+    return ai_service.letter_model(model_name)
+
 @tracing_service.trace_node("cover_letter_generator")
 def cover_letter_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Generate cover letter from matched experiences"""
     
-    job_info = state["job_info"]
+    system, prompt = build_generation_prompt(state)
     experiences = state["matched_experiences"]
-    user_name = state.get("user_name", "Candidate")
     prior_issues = state.get("prior_issues", [])
-    tone = state.get("tone", "Professional, concise, and clearly tailored to the role.")
-    
-    system_prompt = f"""You are a professional writing agent specialized in generating high-quality, concise, and direct cover letters.
-
-Write a 250–350 word cover letter using the information provided.
-
-Requirements:
-1. Begin with a formal greeting: e.g., "Dear [Team/Manager] at {{company}}".
-2. Intro paragraph: state the job title, company name, and express clear enthusiasm.
-3. Body: highlight 1–2 key experiences that demonstrate **transferable skills** applicable to this role.
-4. Closing: reinforce interest, connect to the company's mission, and invite further discussion.
-5. End with: "Sincerely, {user_name}"
-
-**STRICT GUIDELINES:**
-- **NEVER fabricate, invent, or stretch experience** — only use information that is explicitly provided. Do not hallucinate or make up any experience, skills, or qualifications.
-- **If there are no direct experience matches, write an honest cover letter that highlights any transferable skills, strengths, or relevant qualities from the resume that could apply to the job. Do your best to connect the candidate's real background to the job requirements.**
-- **Do NOT include language that highlights flaws, gaps, or self-doubt** (e.g., "While I am still developing...", "Although I lack...", "I am early in my career", "I have limited experience in...").
-- **Do NOT include self-disqualifying or underconfident language**. Focus on strengths, achievements, and readiness.
-- **Be completely truthful and specific** about the candidate's actual experience and skills.
-- **Focus on transferable skills** — Show how existing experience applies to the new role.
-- **Be specific about skills** — Programming, analysis, teamwork, communication, etc.
-- **Highlight learning ability** — Demonstrate adaptability and growth mindset, but only if supported by the resume.
-- **Use concrete examples** — Reference specific projects, courses, or experiences from the resume.
-- **Maintain a {tone} tone throughout**
-- **Be concise and direct, avoiding flowery language**
-- **Emphasize potential and transferability** rather than direct experience matches
-- **PRIORITIZE HONESTY OVER PERFECTION** — It's better to be honest about limitations than to fabricate experience
-
-**CONFIDENCE AND TONE GUIDELINES:**
-- **Always present the candidate in a confident, positive light**
-- **Do not include language that downplays abilities or suggests unqualification**
-- **Avoid phrases like "While I am still developing..." or "Although I lack..."**
-- **If mentioning skills that are being developed, frame them as strengths or evidence of adaptability**
-- **Focus on what the candidate CAN do and WILL contribute, not what they cannot do**
-- **Use language that shows eagerness to learn and grow, not inadequacy**
-- **Maintain enthusiasm and conviction throughout the letter**"""
-    
-    prompt = f"{system_prompt}\n\n### Job Description:\n{json.dumps(job_info, indent=2)}\n\n### Matched Experiences:\n{json.dumps(experiences, indent=2)}"
-    
-    if prior_issues:
-        issue_str = "\n".join(f"- {issue}" for issue in prior_issues)
-        prompt += f"\n\nThe previous draft was rejected for the following reasons. Please address them:\n{issue_str}"
     
     try:
         response = ai_service.invoke_with_retry(
-            model_name="claude-opus-4",
+            model_name=generator_model(state),
             prompt=prompt,
+            system=system,
             metadata={
                 "operation": "cover_letter_generation",
                 "prior_issues_count": len(prior_issues),
@@ -253,53 +392,73 @@ Requirements:
         return state
         
     except Exception as e:
-        logger.error(f"Cover letter generation failed: {str(e)}")
+        logger.exception(f"Cover letter generation failed: {str(e)}")
         state["cover_letter"] = "Error generating cover letter. Please try again."
         return state
 
-@tracing_service.trace_node("cover_letter_validator")
-def cover_letter_validator_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Validate generated cover letter quality"""
+def build_generation_prompt(state: Dict[str, Any]) -> Tuple[Tuple[str, str], str]:
+    """Build the cover letter (system blocks, user message), shared by the generator node and the streaming path.
+
+    Everything that stays fixed across revision rounds goes in a second cached system
+    block after _GENERATOR_SYSTEM, so a rewrite only sends the rejection reasons as new input.
+    """
     
-    letter = state["cover_letter"]
-    job_info = state["job_info"]
+    experiences = state["matched_experiences"]
+    user_name = state.get("user_name") or "Candidate"
+    prior_issues = state.get("prior_issues", [])
+    tone = TONE_DESCRIPTIONS.get(state.get("tone"), TONE_DESCRIPTIONS["professional"])
     
-    system_prompt = """You are a very strict and intelligent QA assistant for AI-generated cover letters.
+    context = "".join(("### Candidate Name:\n", user_name, "\n\n### Tone:\n", tone, "\n\n### Job Description:\n", _job_json(state), "\n\n### Matched Experiences:\n", _dumps(experiences)))
+    
+    if prior_issues:
+        issue_str = "\n".join(f"- {issue}" for issue in prior_issues)
+        prompt = f"The previous draft was rejected for the following reasons. Please address them:\n{issue_str}"
+    else:
+        prompt = "Write the cover letter."
+    
+    return (_GENERATOR_SYSTEM, context), prompt
 
-Evaluate the letter using these criteria:
+def _validator_prompt(letter: str, job_json: str) -> Tuple[Tuple[str, str], str]:
+    """Build the validator (system blocks, user message); job info is a cached block that repeats across revision rounds"""
+    return (_VALIDATOR_SYSTEM, "### Job Info:\n" + job_json), "### Cover Letter:\n" + letter
 
-1. **HONESTY AND TRUTHFULNESS** — Does the letter honestly represent the candidate's experience without ANY fabrication, exaggeration, or hallucination? Even minor exaggerations, vague claims, or made-up details should be flagged.
-2. **Company and Job Mention** — Does it clearly mention the company name and job title?
-3. **Transferable Skills Focus** — Does it effectively connect the candidate's background to the job through specific, concrete transferable skills? Generic or overly flattering language should be flagged.
-4. **Tone and Professionalism** — Is the tone appropriate, professional, and confident? Letters that are too generic, overly flattering, or lack specific, relevant details should be rejected.
-5. **Length and Structure** — Is it well-structured and appropriately sized (250-350 words)? Letters that are too short, too long, or poorly structured should be rejected.
-6. **NO SELF-DISQUALIFYING OR FLAW-HIGHLIGHTING LANGUAGE** — REJECT any letter that includes language about flaws, gaps, self-doubt, or underconfidence (e.g., "While I am still developing...", "Although I lack...", "I am early in my career", "I have limited experience in..."). The letter should focus on strengths and achievements.
-7. **TRANSFERABLE SKILLS ARE ACCEPTABLE** — If there are no direct experience matches, it is acceptable for the letter to focus on transferable skills or general strengths from the resume, as long as it does not fabricate or exaggerate. Only reject if the letter fabricates, exaggerates, or is completely irrelevant.
+# Validation is structured classification against the schema tool, which Haiku handles at a fraction of Sonnet's latency
+_VALIDATOR_MODEL = "claude-3-5-haiku"
 
-Return a JSON object with:
-- "valid": true or false
-- "issues": list of concrete problems if found
-- "score": quality score from 0.0 to 1.0
+def _track_best_draft(state: Dict[str, Any], letter: str):
+    """Remember the highest-scoring draft so a rewrite that scores lower can be rolled back"""
+    score = state["validation_result"].get("score")
+    if not isinstance(score, (int, float)):
+        return
+    best_score = state.get("best_score")
+    if best_score is None or score > best_score:
+        state["best_letter"] = letter
+        state["best_score"] = score
 
-**STRICT HONESTY RULES**:
-- **REJECT letters** that make ANY false, exaggerated, or hallucinated claims about experience, skills, or qualifications
-- **REJECT letters** that are generic, vague, or lack specific, relevant details
-- **REJECT letters** that use overly flattering or flowery language without evidence
-- **REJECT letters** that include self-disqualifying, flaw-highlighting, or underconfident language
-- **ACCEPT letters** that are honest, specific, and focused on transferable skills and strengths, even if there are no direct experience matches
-- **PRIORITIZE HONESTY AND SPECIFICITY OVER PERFECTION** — A truthful, specific letter with gaps is better than a generic or fabricated perfect letter"""
+@tracing_service.trace_node("cover_letter_validator")
+def cover_letter_validator_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate generated cover letter quality"""
+    
+    letter = state["cover_letter"]
+    # Count the draft and keep the previous round's score so the graph can bound the revision loop
+    state["revision_count"] = state.get("revision_count", 0) + 1
+    state["prior_score"] = state.get("validation_result", {}).get("score")
     
-    prompt = f"{system_prompt}\n\n### Cover Letter:\n{letter}\n\n### Job Info:\n{json.dumps(job_info, indent=2)}"
+    system, prompt = _validator_prompt(letter, _job_json(state))
     
     try:
         response = ai_service.invoke_with_retry(
-            model_name="claude-3-7-sonnet",
+            model_name=_VALIDATOR_MODEL,
             prompt=prompt,
+            system=system,
+            cache_ttl=settings.LLM_RESPONSE_CACHE_TTL,
+            output_schema=ValidationResult,
             metadata={"operation": "cover_letter_validation"}
         )
         
         validation_data = ai_service._parse_json_response(response)
         state["validation_result"] = validation_data
+        _track_best_draft(state, letter)
         
         if not validation_data.get("valid", False):
             state["prior_issues"] = validation_data.get("issues", [])
@@ -307,10 +466,184 @@ Return a JSON object with:
         return state
         
     except Exception as e:
-        logger.error(f"Cover letter validation failed: {str(e)}")
+        logger.exception(f"Cover letter validation failed: {str(e)}")
         state["validation_result"] = {
             "valid": False,
             "issues": ["Validation failed due to technical error"],
             "score": 0.0
         }
-        return state
\ No newline at end of file
+        return state
+
+def _generate_draft(model_name: str, messages: Tuple[Tuple[str, str], str], prior_issues_count: int, experiences_count: int) -> Optional[str]:
+    """Generate a backup draft from build_generation_prompt output; None on failure so the graph falls back to the generator node"""
+    system, prompt = messages
+    try:
+        return ai_service.invoke_with_retry(
+            model_name=model_name,
+            prompt=prompt,
+            system=system,
+            metadata={
+                "operation": "speculative_cover_letter_generation",
+                "prior_issues_count": prior_issues_count,
+                "matched_experiences_count": experiences_count
+            }
+        )
+    except Exception as e:
+        logger.warning(f"Speculative generation failed: {str(e)}")
+        return None
+
+def speculative_validator_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate the letter while the next draft is generated concurrently.
+
+    The draft cannot see the issues of the letter being validated, only those
+    of earlier rounds, so it trades some revision quality for one LLM call of
+    latency per rejected letter.
+    """
+    future = _SPECULATIVE_EXECUTOR.submit(
+        contextvars.copy_context().run,
+        _generate_draft,
+        generator_model(state),
+        build_generation_prompt(state),
+        len(state.get("prior_issues") or []),
+        len(state["matched_experiences"])
+    )
+    # LangGraph keeps keys a node leaves out, so clear the last draft rather than let it be adopted again
+    state["speculative_letter"] = None
+    state = cover_letter_validator_node(state)
+    if state["validation_result"].get("valid", False):
+        # Only stops a draft that has not started yet; a running one is discarded
+        future.cancel()
+        return state
+    draft = future.result()
+    if draft:
+        state["speculative_letter"] = draft
+    return state
+
+def adopt_draft_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace the rejected letter with the speculative draft"""
+    state["cover_letter"] = state["speculative_letter"]
+    state["speculative_letter"] = None
+    return state
+
+async def match_experiences_batch(pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+    """Match many (resume_info, job_info) pairs through the Message Batches API, for bulk and offline runs.
+
+    Half price but not latency-critical; results are in input order and failed entries get [].
+    """
+    results: List[List[Dict[str, Any]]] = [[] for _ in pairs]
+    # Same rules as relevance_matcher_node: skip resumes with nothing to match, match on
+    # Haiku first, and resubmit weak or failed matches in one Sonnet batch
+    prompts = {
+        str(index): _matcher_prompt(resume_info, _compact_job_json(job_info))
+        for index, (resume_info, job_info) in enumerate(pairs)
+        if _has_matchable_entries(resume_info)
+    }
+    for model_name in ("claude-3-5-haiku", "claude-3-7-sonnet"):
+        if not prompts:
+            break
+        responses = await ai_service.submit_batch(
+            [
+                ai_service.batch_request(custom_id, model_name, prompt, _MATCHER_SYSTEM, MatchingResult)
+                for custom_id, prompt in prompts.items()
+            ],
+            label="Matcher"
+        )
+        weak = {}
+        for custom_id, prompt in prompts.items():
+            try:
+                matched = ai_service._parse_json_response(responses[custom_id]).get("matched_experiences", [])
+                results[int(custom_id)] = matched
+            except (KeyError, ValueError):
+                # Keep any earlier (weak) result; a failed first attempt still gets the Sonnet retry
+                logger.warning(f"Matcher batch request {custom_id} on {model_name} produced no result")
+                matched = results[int(custom_id)]
+            if _weak_match(matched):
+                weak[custom_id] = prompt
+        prompts = weak
+    return results
+
+async def validate_letters_batch(pairs: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Validate many (cover_letter, job_info) pairs through the Message Batches API, for bulk and offline runs.
+
+    Results are in input order; failed entries get the same verdict as a failed validator node call.
+    """
+    requests = []
+    for index, (letter, job_info) in enumerate(pairs):
+        system, prompt = _validator_prompt(letter, _compact_job_json(job_info))
+        requests.append(ai_service.batch_request(str(index), _VALIDATOR_MODEL, prompt, system, ValidationResult))
+    responses = await ai_service.submit_batch(requests, label="Validator")
+    results = []
+    for index in range(len(pairs)):
+        try:
+            results.append(ai_service._parse_json_response(responses[str(index)]))
+        except (KeyError, ValueError):
+            logger.warning(f"Validator batch request {index} produced no result")
+            results.append({
+                "valid": False,
+                "issues": ["Validation failed due to technical error"],
+                "score": 0.0
+            })
+    return results
+
+async def generate_letters_batch(states: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """Generate letters for many matched states through the Message Batches API, for bulk and offline runs.
+
+    Results are in input order; failed entries are None.
+    """
+    requests = []
+    for index, state in enumerate(states):
+        system, prompt = build_generation_prompt(state)
+        requests.append(ai_service.batch_request(str(index), generator_model(state), prompt, system))
+    responses = await ai_service.submit_batch(requests, label="Generator")
+    results = []
+    for index in range(len(states)):
+        letter = responses.get(str(index))
+        if letter is None:
+            logger.warning(f"Generator batch request {index} produced no result")
+        results.append(letter)
+    return results
+
+async def run_pipeline_batch(states: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run the whole pipeline for many initial states with one Message Batch per stage.
+
+    Each letter gets a single draft and validation pass; callers can rerun
+    rejected ones through the interactive graph. States that fail input or
+    document validation are returned flagged, without a letter.
+    """
+    states = [input_validation_node(dict(state)) for state in states]
+    active = [state for state in states if not state.get("validation_failed")]
+    if not active:
+        return states
+
+    resume_infos, job_infos = await asyncio.gather(
+        ai_service.parse_resumes_batch([state["resume_posting"] for state in active]),
+        ai_service.parse_jobs_batch([state["job_posting"] for state in active])
+    )
+    for state, resume_info, job_info in zip(active, resume_infos, job_infos):
+        # Failed batch entries are left unset, so the parser nodes fall back to an interactive parse
+        if resume_info:
+            state["resume_info"] = resume_info
+        if job_info:
+            state["job_info"] = job_info
+    # Off the event loop, since a fallback parse is a blocking LLM call
+    await asyncio.gather(*(asyncio.to_thread(parse_inputs_node, state) for state in active))
+    active = [state for state in active if not state.get("validation_failed")]
+    if not active:
+        return states
+
+    matches = await match_experiences_batch([(state["resume_info"], state["job_info"]) for state in active])
+    for state, matched in zip(active, matches):
+        state["matched_experiences"] = matched
+
+    letters = await generate_letters_batch(active)
+    drafted = []
+    for state, letter in zip(active, letters):
+        if letter:
+            state["cover_letter"] = letter
+            drafted.append(state)
+
+    verdicts = await validate_letters_batch([(state["cover_letter"], state["job_info"]) for state in drafted])
+    for state, verdict in zip(drafted, verdicts):
+        state["validation_result"] = verdict
+        state["revision_count"] = 1
+    return states
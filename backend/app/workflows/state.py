@@ -1,16 +1,22 @@
 from typing import TypedDict, List, Optional, Dict, Any
 from pydantic import BaseModel
 
-class CoverLetterState(TypedDict, total=False):
-    """Type-safe state definition for LangGraph workflow"""
+class _RequiredState(TypedDict):
+    """Fields every workflow run must start with"""
     resume_posting: str
     job_posting: str
+
+
+class CoverLetterState(_RequiredState, total=False):
+    """Type-safe state definition for LangGraph workflow"""
     tone: str
     user_name: Optional[str]
+    generator_model: Optional[str]
     
     # Parsed data
     resume_info: Dict[str, Any]
     job_info: Dict[str, Any]
+    job_info_json: str  # compact prompt serialization of job_info, shared by downstream nodes
     
     # Processing data
     matched_experiences: List[Dict[str, Any]]
@@ -19,29 +25,36 @@ class CoverLetterState(TypedDict, total=False):
     # Validation data
     validation_result: Dict[str, Any]
     prior_issues: Optional[List[str]]
+    revision_count: int
+    prior_score: Optional[float]
+    best_letter: Optional[str]
+    best_score: Optional[float]
     input_validation: Dict[str, Any]
     validation_failed: bool
     validation_error: Dict[str, Any]
+    speculative_letter: Optional[str]
     
     # Output data
     export_path: Optional[str]
     generation_metadata: Dict[str, Any]
 
 
+_INITIAL_FIELDS = _RequiredState.__required_keys__
+_PARSED_FIELDS = frozenset(("resume_info", "job_info"))
+
+
 class StateValidator(BaseModel):
     """Validator for LangGraph state transitions"""
     
     @staticmethod
     def validate_initial_state(state: CoverLetterState) -> bool:
         """Validate that initial state has required fields"""
-        required_fields = ["resume_posting", "job_posting"]
-        return all(field in state for field in required_fields)
+        return _INITIAL_FIELDS <= state.keys()
     
     @staticmethod
     def validate_parsed_state(state: CoverLetterState) -> bool:
         """Validate that parsing is complete"""
-        required_fields = ["resume_info", "job_info"]
-        return all(field in state for field in required_fields)
+        return _PARSED_FIELDS <= state.keys()
     
     @staticmethod
     def validate_generation_state(state: CoverLetterState) -> bool:
@@ -59,5 +72,18 @@ class StateValidator(BaseModel):
             "experiences_matched": "matched_experiences" in state,
             "letter_generated": "cover_letter" in state,
             "validation_complete": "validation_result" in state,
-            "state_keys": list(state.keys())
-        }
\ No newline at end of file
+            "state_keys": tuple(state)
+        }
+
+class LazyStateSummary:
+    """Log extra that builds the state summary only when a handler formats it"""
+
+    __slots__ = ("state",)
+
+    def __init__(self, state: CoverLetterState):
+        self.state = state
+
+    def __str__(self) -> str:
+        return str(StateValidator.get_state_summary(self.state))
+
+    __repr__ = __str__
@@ -36,8 +36,13 @@ async def lifespan(app: FastAPI):
             logger.info("Cache service initialized (Redis connected)")
         else:
             logger.info("Cache service initialized (Redis disabled)")
+        from app.services.rate_limit_service import rate_limit_service
+        await rate_limit_service.initialize()
         from app.services.ai_service import ai_service
         logger.info("AI service initialized")
+        from app.workflows.graph import get_graph
+        get_graph()
+        logger.info("Workflow graph compiled")
         if settings.ENABLE_TRACING:
             logger.info("Tracing service initialized")
     except Exception as e:
@@ -48,13 +53,22 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down LetterChain API...")
+    # Each step runs on its own so a failure cannot skip the rest; tracing goes last to flush everything queued
     try:
         from app.services.cache_service import cache_service
-        if cache_service.redis_client:
-            cache_service.redis_client.close()
-            logger.info("Cache service shutdown complete")
+        await cache_service.close()
+        logger.info("Cache service shutdown complete")
     except Exception as e:
-        logger.error(f"Shutdown cleanup failed: {str(e)}")
+        logger.error(f"Cache service shutdown failed: {str(e)}")
+    try:
+        from app.services.rate_limit_service import rate_limit_service
+        await rate_limit_service.close()
+    except Exception as e:
+        logger.error(f"Rate limiter shutdown failed: {str(e)}")
+    try:
+        tracing_service.shutdown()
+    except Exception as e:
+        logger.error(f"Tracing shutdown failed: {str(e)}")
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application"""
@@ -57,41 +57,104 @@ class TestFileService:
             assert result.is_valid is False
             assert "too large" in result.error_message
 
-    def test_generate_file_hash(self):
-        """Test file hash generation for caching."""
+    @pytest.mark.asyncio
+    async def test_read_bounded_rejects_oversized_upload(self):
+        """Test that uploads are rejected once they exceed the size limit."""
         from app.services.file_service import FileService
-        
-        content = "test content"
-        result = FileService.generate_file_hash(content)
-        
-        # Should be a valid SHA-256 hash (64 hex characters)
-        assert len(result) == 64
-        assert all(c in '0123456789abcdef' for c in result)
+        from fastapi import HTTPException, UploadFile
+        import io
+
+        small = UploadFile(file=io.BytesIO(b"x" * 100), filename="resume.txt")
+        assert await FileService.read_bounded(small, 1024) == b"x" * 100
+
+        large = UploadFile(file=io.BytesIO(b"x" * 200 * 1024), filename="resume.txt")
+        with pytest.raises(HTTPException) as exc_info:
+            await FileService.read_bounded(large, 100 * 1024, "Resume")
+        assert exc_info.value.status_code == 413
+
+    @pytest.mark.asyncio
+    async def test_concurrent_pdf_extraction_is_serialized(self):
+        """Test that two PDFs extracted at once never enter PDFium together."""
+        from app.services.file_service import FileService
+        import asyncio
+        import threading
+        import time
+
+        active = 0
+        peak = 0
+        counter_lock = threading.Lock()
+
+        class FakeDocument:
+            def __init__(self, data):
+                nonlocal active, peak
+                with counter_lock:
+                    active += 1
+                    peak = max(peak, active)
+                self.text = data.decode()
+
+            def __len__(self):
+                return 1
+
+            def __getitem__(self, index):
+                page = MagicMock()
+                page.get_textpage.return_value.get_text_range.return_value = self.text
+                return page
+
+            def close(self):
+                nonlocal active
+                time.sleep(0.05)
+                with counter_lock:
+                    active -= 1
+
+        with patch('app.services.file_service.pdfium.PdfDocument', FakeDocument):
+            resume_text, job_text = await asyncio.gather(
+                asyncio.to_thread(FileService._extract_pdf_text, b"resume text"),
+                asyncio.to_thread(FileService._extract_pdf_text, b"job text"),
+            )
+
+        assert resume_text == "resume text"
+        assert job_text == "job text"
+        assert peak == 1
+
+    def test_docx_extraction_rejects_entities_and_oversized_xml(self):
+        """Test that DOCX XML entities stay unexpanded and oversized document.xml is refused."""
+        from app.services.file_service import FileService
+        import io
+        import zipfile
+
+        document_xml = (
+            '<?xml version="1.0"?><!DOCTYPE d [<!ENTITY secret "SECRET">]>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            '<w:p><w:r><w:t>Jane Doe</w:t></w:r></w:p>'
+            '<w:p><w:r><w:t>&secret;</w:t></w:r></w:p>'
+            '</w:body></w:document>'
+        )
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("word/document.xml", document_xml)
+        docx_bytes = buffer.getvalue()
+
+        text = FileService._extract_docx_text(docx_bytes)
+        assert "Jane Doe" in text
+        assert "SECRET" not in text
+
+        with patch('app.services.file_service.MAX_DOCX_XML_SIZE', 100):
+            with pytest.raises(ValueError, match="too large"):
+                FileService._extract_docx_text(docx_bytes)
 
 
 class TestCacheService:
     """Test core caching functionality."""
     
-    def test_generate_cache_key(self):
-        """Test cache key generation."""
+    def test_hash_content_normalizes_whitespace(self):
+        """Test that content hashing ignores whitespace differences."""
         from app.services.cache_service import CacheService
-        
-        with patch('app.services.cache_service.settings') as mock_settings:
-            mock_settings.REDIS_URL = "redis://localhost:6379"
-            
-            with patch('redis.from_url') as mock_redis_from_url:
-                mock_redis_client = MagicMock()
-                mock_redis_client.ping.return_value = True
-                mock_redis_from_url.return_value = mock_redis_client
-                
-                cache_service = CacheService()
-                
-                content = "test content"
-                result = cache_service._generate_key("resume", content)
-                
-                # Should start with prefix and contain hash
-                assert result.startswith("resume:")
-                assert len(result) > 10
+
+        digest = CacheService.hash_content("Jane Doe\n  Engineer")
+
+        assert digest == CacheService.hash_content("Jane Doe Engineer  ")
+        assert digest != CacheService.hash_content("Jane Doe Designer")
+        assert len(digest) == 32
 
     def test_cache_get_set_operations(self):
         """Test basic cache get/set operations."""
@@ -120,6 +183,74 @@ class TestCacheService:
                 assert result == test_data
 
 
+    def test_cache_compresses_large_values(self):
+        """Test that large values are gzip-compressed and round-trip intact."""
+        from app.services.cache_service import CacheService, GZIP_PREFIX
+
+        with patch('app.services.cache_service.settings') as mock_settings:
+            mock_settings.REDIS_URL = "redis://localhost:6379"
+
+            with patch('redis.from_url') as mock_redis_from_url:
+                mock_redis_client = MagicMock()
+                mock_redis_client.ping.return_value = True
+                mock_redis_from_url.return_value = mock_redis_client
+
+                cache_service = CacheService()
+
+                test_data = {"experience": [{"description": "Built APIs " * 20}] * 20}
+                cache_service.set("test-key", test_data)
+                stored = mock_redis_client.setex.call_args[0][2]
+                assert stored.startswith(GZIP_PREFIX)
+
+                mock_redis_client.get.return_value = stored
+                assert cache_service.get("test-key") == test_data
+
+    @pytest.mark.asyncio
+    async def test_async_cache_get_set_operations(self):
+        """Test that the async client round-trips values like the sync one."""
+        from app.services.cache_service import CacheService
+        from unittest.mock import AsyncMock
+
+        with patch('redis.from_url') as mock_redis_from_url:
+            mock_redis_from_url.return_value.ping.return_value = True
+            cache_service = CacheService()
+
+        cache_service.async_client = AsyncMock()
+        test_data = {"name": "John", "age": 30}
+
+        assert await cache_service.set_async("test-key", test_data)
+        stored = cache_service.async_client.setex.call_args[0][2]
+
+        cache_service.async_client.get.return_value = stored
+        assert await cache_service.get_async("test-key") == test_data
+
+    @pytest.mark.asyncio
+    async def test_corrupt_compressed_values_read_as_misses(self):
+        """Test that truncated or corrupt gzip payloads degrade to cache misses."""
+        from app.services.cache_service import CacheService, GZIP_PREFIX
+        from unittest.mock import AsyncMock
+        import gzip
+
+        with patch('redis.from_url') as mock_redis_from_url:
+            mock_redis_from_url.return_value.ping.return_value = True
+            cache_service = CacheService()
+
+        payload = gzip.compress(json.dumps({"summary": "Built APIs " * 200}).encode())
+        truncated = GZIP_PREFIX + payload[:20]
+        corrupt = GZIP_PREFIX + payload[:10] + b"\xff" * 16 + payload[26:]
+
+        cache_service.redis_client.get.return_value = truncated
+        assert cache_service.get("test-key") is None
+
+        cache_service.async_client = AsyncMock()
+        cache_service.async_client.get.return_value = corrupt
+        assert await cache_service.get_async("test-key") is None
+        assert await cache_service.get_raw_async("test-key") is None
+
+        cache_service.async_client.mget.return_value = [truncated, corrupt]
+        assert await cache_service.multi_get_async(["a", "b"]) == [None, None]
+
+
 class TestAIService:
     """Test core AI functionality."""
     
@@ -180,6 +311,293 @@ class TestAIService:
             assert result["age"] == 30
 
 
+    def test_token_bucket_delays_once_budget_is_spent(self):
+        """Test that the outbound throttle only delays calls beyond the per-minute budget."""
+        from app.services.ai_service import TokenBucket
+
+        bucket = TokenBucket(rate_per_minute=60)
+
+        assert all(bucket.reserve() == 0 for _ in range(60))
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+
+    def test_token_bucket_pause_delays_next_caller(self):
+        """Test that a retry-after pause holds back callers even with budget left."""
+        from app.services.ai_service import TokenBucket
+
+        bucket = TokenBucket(rate_per_minute=60)
+        bucket.pause(5)
+
+        assert bucket.reserve() == pytest.approx(6.0, abs=0.05)
+
+    def test_parse_resume_served_from_cache(self):
+        """Test that cached resumes skip the LLM call."""
+        from app.services.ai_service import AIService
+
+        with patch('app.services.ai_service.settings') as mock_settings:
+            mock_settings.ANTHROPIC_API_KEY = "test-key"
+            ai_service = AIService()
+
+        with patch('app.services.ai_service.cache_service') as mock_cache:
+            mock_cache.get_parsed_resume.return_value = {"name": "John"}
+            with patch.object(ai_service, 'invoke_with_retry') as mock_invoke:
+                result = ai_service.parse_resume("resume text")
+
+        assert result == {"name": "John"}
+        mock_invoke.assert_not_called()
+
+    def test_build_messages_caches_each_system_block(self):
+        """Test that every system block is sent as its own prompt-cache breakpoint."""
+        from app.services.ai_service import AIService
+
+        system_message, human_message = AIService._build_messages("letter", ("static rules", "job context"))
+
+        assert [block["text"] for block in system_message.content] == ["static rules", "job context"]
+        assert all(block["cache_control"] == {"type": "ephemeral"} for block in system_message.content)
+        assert human_message.content == "letter"
+        assert AIService._build_messages("prompt") == "prompt"
+
+    def test_invoke_with_retry_served_from_response_cache(self):
+        """Test that a cacheable call served from the response cache skips the model."""
+        from app.services.ai_service import AIService
+
+        with patch('app.services.ai_service.settings') as mock_settings:
+            mock_settings.ANTHROPIC_API_KEY = "test-key"
+            ai_service = AIService()
+
+        with patch('app.services.ai_service.cache_service') as mock_cache:
+            mock_cache.get_llm_response.return_value = '{"valid": true}'
+            with patch.object(ai_service, 'get_model') as mock_get_model:
+                result = ai_service.invoke_with_retry("claude-3-7-sonnet", "prompt", cache_ttl=60)
+
+        assert result == '{"valid": true}'
+        mock_get_model.assert_not_called()
+
+    def test_invoke_with_output_schema_returns_tool_input(self):
+        """Test that a structured call forces the output tool and returns its input as JSON."""
+        from app.services.ai_service import AIService, OUTPUT_TOOL_NAME
+        from app.models.schemas import ValidationResult
+        from langchain_core.messages import AIMessage
+
+        with patch('app.services.ai_service.settings') as mock_settings:
+            mock_settings.ANTHROPIC_API_KEY = "test-key"
+            ai_service = AIService()
+
+        bound_model = MagicMock()
+        bound_model.invoke.return_value = AIMessage(
+            content="",
+            tool_calls=[{"name": OUTPUT_TOOL_NAME, "args": {"valid": True, "issues": [], "score": 0.9}, "id": "call-1"}]
+        )
+        with patch.object(ai_service, 'get_model') as mock_get_model, \
+             patch('app.services.ai_service.tracing_service'):
+            mock_get_model.return_value.bind_tools.return_value = bound_model
+            result = ai_service.invoke_with_retry("claude-3-7-sonnet", "prompt", output_schema=ValidationResult)
+
+        assert json.loads(result) == {"valid": True, "issues": [], "score": 0.9}
+        tools = mock_get_model.return_value.bind_tools.call_args.args[0]
+        assert tools[0]["input_schema"] == ValidationResult.model_json_schema()
+        assert mock_get_model.return_value.bind_tools.call_args.kwargs == {"tool_choice": OUTPUT_TOOL_NAME}
+
+    @pytest.mark.asyncio
+    async def test_parse_resume_and_job_async(self):
+        """Test that combined parsing reads both entries at once and only parses misses."""
+        from app.services.ai_service import AIService
+        from app.services.cache_service import CacheService, PARSE_CACHE_TTL_SECONDS
+        from unittest.mock import AsyncMock
+
+        with patch('app.services.ai_service.settings') as mock_settings:
+            mock_settings.ANTHROPIC_API_KEY = "test-key"
+            ai_service = AIService()
+
+        ai_service._parse_resume_uncached_async = AsyncMock(return_value={"name": "John"})
+        ai_service._parse_job_uncached_async = AsyncMock()
+
+        with patch('app.services.ai_service.cache_service') as mock_cache:
+            mock_cache.hash_content.side_effect = lambda text: text
+            mock_cache.resume_key = CacheService.resume_key
+            mock_cache.job_key = CacheService.job_key
+            mock_cache.multi_get_async = AsyncMock(return_value=[None, {"title": "Engineer"}])
+            mock_cache.multi_set_async = AsyncMock()
+
+            parsed_resume, parsed_job = await ai_service.parse_resume_and_job_async("resume", "job")
+
+        assert parsed_resume == {"name": "John"}
+        assert parsed_job == {"title": "Engineer"}
+        mock_cache.multi_get_async.assert_awaited_once_with(["resume:v2:resume", "job:v2:job"])
+        mock_cache.multi_set_async.assert_awaited_once_with({"resume:v2:resume": {"name": "John"}}, PARSE_CACHE_TTL_SECONDS)
+        ai_service._parse_job_uncached_async.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_parse_resumes_batch_dedupes_and_skips_cached(self):
+        """Test that batch parsing submits only uncached, unique resumes."""
+        from app.services.ai_service import AIService
+        from unittest.mock import AsyncMock
+        from types import SimpleNamespace
+
+        with patch('app.services.ai_service.settings') as mock_settings:
+            mock_settings.ANTHROPIC_API_KEY = "test-key"
+            ai_service = AIService()
+
+        async def results(batch_id):
+            async def entries():
+                for request in mock_client.messages.batches.create.call_args.kwargs["requests"]:
+                    message = SimpleNamespace(content=[SimpleNamespace(type="text", text='{"name": "Jane"}')])
+                    yield SimpleNamespace(
+                        custom_id=request["custom_id"],
+                        result=SimpleNamespace(type="succeeded", message=message)
+                    )
+            return entries()
+
+        mock_client = MagicMock()
+        mock_client.messages.batches.create = AsyncMock(
+            return_value=SimpleNamespace(id="batch-1", processing_status="ended")
+        )
+        mock_client.messages.batches.results = results
+        ai_service._batch_client = mock_client
+
+        with patch('app.services.ai_service.cache_service') as mock_cache:
+            mock_cache.hash_content.side_effect = lambda text: text
+            mock_cache.get_parsed_resume_async = AsyncMock(
+                side_effect=lambda key: {"name": "John"} if key == "cached" else None
+            )
+            mock_cache.set_parsed_resume_async = AsyncMock()
+            parsed = await ai_service.parse_resumes_batch(["new", "cached", "new"])
+
+        assert parsed == [{"name": "Jane"}, {"name": "John"}, {"name": "Jane"}]
+        requests = mock_client.messages.batches.create.call_args.kwargs["requests"]
+        assert len(requests) == 1
+        assert requests[0]["params"]["tool_choice"] == {"type": "tool", "name": "emit_result"}
+
+
+class TestMiddleware:
+    """Test core middleware functionality."""
+
+    def test_observability_adds_process_time_header(self):
+        """Test that the ASGI observability middleware adds X-Process-Time."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.api.middleware import ObservabilityMiddleware
+
+        app = FastAPI()
+        app.add_middleware(ObservabilityMiddleware)
+
+        @app.get("/ping")
+        async def ping():
+            return {"ok": True}
+
+        response = TestClient(app).get("/ping")
+
+        assert response.status_code == 200
+        assert response.json() == {"ok": True}
+        assert float(response.headers["X-Process-Time"]) >= 0
+
+
+    def test_rate_limit_rejects_over_limit_clients(self):
+        """Test that limited endpoints return 429 once a client is over the limit."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from unittest.mock import AsyncMock
+        from app.api.middleware import RateLimitMiddleware
+        from app.core.config import settings
+
+        app = FastAPI()
+        app.add_middleware(RateLimitMiddleware)
+
+        @app.post(f"{settings.API_V1_STR}/generate")
+        async def generate():
+            return {"ok": True}
+
+        client = TestClient(app)
+        with patch('app.api.middleware.rate_limit_service') as mock_limiter:
+            mock_limiter.limit = 5
+            mock_limiter.window_ms = 60000
+            mock_limiter.is_allowed = AsyncMock(return_value=True)
+            assert client.post(f"{settings.API_V1_STR}/generate").status_code == 200
+
+            mock_limiter.is_allowed = AsyncMock(return_value=False)
+            response = client.post(f"{settings.API_V1_STR}/generate")
+            assert response.status_code == 429
+            assert response.headers["Retry-After"] == "60"
+            assert "Rate limit exceeded" in response.json()["detail"]
+
+    def test_rate_limit_keys_on_trusted_forwarded_hop(self):
+        """Test that behind a proxy the client is read from the hop the proxy appended."""
+        from app.api.middleware import RateLimitMiddleware
+
+        scope = {
+            "client": ("10.0.0.1", 443),
+            "headers": [(b"x-forwarded-for", b"6.6.6.6, 203.0.113.7")]
+        }
+        with patch('app.api.middleware.settings') as mock_settings:
+            mock_settings.TRUSTED_PROXY_HOPS = 0
+            assert RateLimitMiddleware.client_ip(scope) == "10.0.0.1"
+            mock_settings.TRUSTED_PROXY_HOPS = 1
+            assert RateLimitMiddleware.client_ip(scope) == "203.0.113.7"
+
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_counts_requests_in_flight_to_redis(self):
+        """Test that counts drained into an unfinished flush still count against the limit."""
+        from app.services.rate_limit_service import RateLimitService
+        from unittest.mock import AsyncMock
+        import asyncio
+        import time
+
+        released = asyncio.Event()
+
+        async def execute():
+            await released.wait()
+            return [4]
+
+        pipe = MagicMock()
+        pipe.execute = execute
+        pipeline = MagicMock()
+        pipeline.__aenter__ = AsyncMock(return_value=pipe)
+        pipeline.__aexit__ = AsyncMock(return_value=False)
+
+        service = RateLimitService(limit=5)
+        service._available = True
+        service.redis_client = MagicMock()
+        service.redis_client.pipeline.return_value = pipeline
+        service.redis_client.zcount = AsyncMock(return_value=3)
+        service._snapshots["client"] = (3, int(time.time() * 1000))
+
+        assert await service.is_allowed("client") is True
+        flush = asyncio.create_task(service._flush())
+        await asyncio.sleep(0)
+
+        # Redis still reports 3 while the flush is in flight: 3 + 1 in flight + 1 pending hits the limit
+        assert await service.is_allowed("client") is True
+        assert await service.is_allowed("client") is False
+
+        released.set()
+        await flush
+        assert service.counter.in_flight == {}
+        assert service._snapshots["client"][0] == 4
+
+    def test_upload_size_limit_rejects_large_content_length(self):
+        """Test that oversized upload requests are rejected before the form is parsed."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.api.middleware import UploadSizeLimitMiddleware
+        from app.core.config import settings
+
+        app = FastAPI()
+        app.add_middleware(UploadSizeLimitMiddleware)
+
+        @app.post(f"{settings.API_V1_STR}/generate")
+        async def generate():
+            return {"ok": True}
+
+        client = TestClient(app)
+        assert client.post(f"{settings.API_V1_STR}/generate", content=b"x" * 1024).status_code == 200
+
+        response = client.post(
+            f"{settings.API_V1_STR}/generate",
+            content=b"x" * (2 * settings.MAX_FILE_SIZE + 128 * 1024)
+        )
+        assert response.status_code == 413
+
+
 class TestGraphService:
     """Test core workflow functionality."""
     
@@ -196,6 +614,325 @@ class TestGraphService:
         assert result["status"] == "completed"
         assert result["progress"] == 100
 
+    def test_resume_parser_flags_invalid_resume(self):
+        """Test that the parser's validity verdict fails validation and is stripped from resume_info."""
+        from app.workflows.nodes import resume_parser_node
+
+        state = {
+            "resume_posting": "lorem ipsum " * 20,
+            "resume_info": {"name": "Candidate", "valid": False, "issues": ["Not a resume"]}
+        }
+        result = resume_parser_node(state)
+
+        assert result["validation_failed"] is True
+        assert result["validation_error"]["resume_issues"] == ["Not a resume"]
+        assert "valid" not in result["resume_info"]
+
+    def test_parse_inputs_merges_both_parsers(self):
+        """Test that the combined parse node merges both parses and both validity verdicts."""
+        from app.workflows import nodes
+
+        with patch.object(nodes.ai_service, 'parse_resume', return_value={"name": "Jane", "valid": False, "issues": ["Not a resume"]}), \
+             patch.object(nodes.ai_service, 'parse_job', return_value={"title": "Engineer", "valid": True, "issues": []}):
+            result = nodes.parse_inputs_node({"resume_posting": "resume text", "job_posting": "job text"})
+
+        assert result["user_name"] == "Jane"
+        assert result["job_info"] == {"title": "Engineer"}
+        assert result["validation_failed"] is True
+        assert result["validation_error"] == {"resume_issues": ["Not a resume"], "job_issues": []}
+
+    @pytest.mark.asyncio
+    async def test_match_experiences_batch_keeps_input_order(self):
+        """Test that batched matching maps results back by index and defaults failed entries."""
+        from app.workflows import nodes
+        from unittest.mock import AsyncMock
+
+        responses = {
+            "claude-3-5-haiku": {
+                "1": '{"matched_experiences": [{"title": "Developer", "relevance_score": 0.8}]}',
+                "2": '{"matched_experiences": [{"title": "Cashier", "relevance_score": 0.1}]}'
+            },
+            "claude-3-7-sonnet": {"2": '{"matched_experiences": [{"title": "Analyst", "relevance_score": 0.7}]}'}
+        }
+
+        async def submit(requests, label):
+            model = requests[0]["params"]["model"]
+            return responses["claude-3-5-haiku" if "haiku" in model else "claude-3-7-sonnet"]
+
+        with patch.object(nodes.ai_service, 'submit_batch', AsyncMock(side_effect=submit)) as mock_submit:
+            results = await nodes.match_experiences_batch([
+                ({"name": "A"}, {"title": "X"}),
+                ({"name": "B", "experience": [{"title": "Developer"}]}, {"title": "Y"}),
+                ({"name": "C", "experience": [{"title": "Analyst"}]}, {"title": "Z"})
+            ])
+
+        assert results == [
+            [],
+            [{"title": "Developer", "relevance_score": 0.8}],
+            [{"title": "Analyst", "relevance_score": 0.7}]
+        ]
+        haiku_requests, sonnet_requests = (call.args[0] for call in mock_submit.await_args_list)
+        assert [request["custom_id"] for request in haiku_requests] == ["1", "2"]
+        assert [request["custom_id"] for request in sonnet_requests] == ["2"]
+        assert haiku_requests[0]["params"]["tool_choice"] == {"type": "tool", "name": "emit_result"}
+
+    @pytest.mark.asyncio
+    async def test_run_pipeline_batch_stages_through_batches(self):
+        """Test that the bulk pipeline batches each stage and skips states that fail input validation."""
+        from app.workflows import nodes
+        from unittest.mock import AsyncMock
+
+        responses = {
+            "Matcher": {"0": '{"matched_experiences": [{"title": "Developer", "relevance_score": 0.8}]}'},
+            "Generator": {"0": "Dear Hiring Manager, ..."},
+            "Validator": {"0": '{"valid": true, "issues": [], "score": 0.9}'}
+        }
+        document = "Experienced software developer building reliable web services and APIs. " * 3
+        states = [
+            {"resume_posting": document, "job_posting": document, "tone": "professional"},
+            {"resume_posting": "too short", "job_posting": document, "tone": "professional"}
+        ]
+        with patch.object(nodes.ai_service, 'parse_resumes_batch', AsyncMock(return_value=[{"name": "Jane", "experience": [{"title": "Developer"}]}])), \
+             patch.object(nodes.ai_service, 'parse_jobs_batch', AsyncMock(return_value=[{"title": "Engineer", "company": "Acme"}])), \
+             patch.object(nodes.ai_service, 'submit_batch', AsyncMock(side_effect=lambda requests, label: responses[label])) as mock_submit:
+            results = await nodes.run_pipeline_batch(states)
+
+        assert results[0]["cover_letter"] == "Dear Hiring Manager, ..."
+        assert results[0]["validation_result"]["valid"] is True
+        assert results[0]["user_name"] == "Jane"
+        assert results[1]["validation_failed"] is True
+        assert "cover_letter" not in results[1]
+        assert [call.kwargs["label"] for call in mock_submit.await_args_list] == ["Matcher", "Generator", "Validator"]
+
+    def test_matcher_falls_back_to_sonnet_on_weak_match(self):
+        """Test that a low-scoring Haiku match is retried once on Sonnet."""
+        from app.workflows import nodes
+
+        responses = {
+            "claude-3-5-haiku": '{"matched_experiences": [{"title": "Cashier", "relevance_score": 0.1}]}',
+            "claude-3-7-sonnet": '{"matched_experiences": [{"title": "Developer", "relevance_score": 0.8}]}'
+        }
+        with patch.object(nodes.ai_service, 'invoke_with_retry', side_effect=lambda model_name, **kwargs: responses[model_name]):
+            result = nodes.relevance_matcher_node({
+                "resume_info": {"name": "A", "experience": [{"title": "Developer"}]},
+                "job_info": {"title": "Engineer"}
+            })
+
+        assert result["matched_experiences"] == [{"title": "Developer", "relevance_score": 0.8}]
+
+    def test_matcher_falls_back_to_sonnet_on_haiku_error(self):
+        """Test that a Haiku API failure is retried on Sonnet instead of dropping the matches."""
+        from app.workflows import nodes
+
+        def invoke(model_name, **kwargs):
+            if model_name == "claude-3-5-haiku":
+                raise RuntimeError("overloaded_error")
+            return '{"matched_experiences": [{"title": "Developer", "relevance_score": 0.8}]}'
+
+        with patch.object(nodes.ai_service, 'invoke_with_retry', side_effect=invoke):
+            result = nodes.relevance_matcher_node({
+                "resume_info": {"name": "A", "experience": [{"title": "Developer"}]},
+                "job_info": {"title": "Engineer"}
+            })
+
+        assert result["matched_experiences"] == [{"title": "Developer", "relevance_score": 0.8}]
+
+    def test_matcher_skips_llm_without_experience(self):
+        """Test that a resume with nothing to match skips the matcher call."""
+        from app.workflows import nodes
+
+        with patch.object(nodes.ai_service, 'invoke_with_retry') as mock_invoke:
+            result = nodes.relevance_matcher_node({
+                "resume_info": {"name": "A", "experience": [], "education": [], "skills": ["Python"]},
+                "job_info": {"title": "Engineer"}
+            })
+
+        assert result["matched_experiences"] == []
+        mock_invoke.assert_not_called()
+
+    def test_generator_model_escalates_after_rejections(self):
+        """Test that letters start on Sonnet, escalate to Opus and honour a per-request model."""
+        from app.workflows.nodes import generator_model
+
+        assert generator_model({}) == "claude-3-7-sonnet-letter"
+        assert generator_model({"prior_issues": ["Too long", "Generic"]}) == "claude-opus-4-letter"
+        assert generator_model({"generator_model": "claude-opus-4"}) == "claude-opus-4-letter"
+
+    def test_default_letter_model_caps_tokens(self):
+        """Test that the default letter model carries the letter token cap and generation temperature."""
+        from app.workflows.nodes import generator_model, ai_service
+
+        config = ai_service.model_configs[generator_model({})]
+
+        assert config["model"] == "claude-3-7-sonnet-20250219"
+        assert config["max_tokens"] == 600
+        assert config["temperature"] == 0.6
+        assert ai_service.batch_request("0", generator_model({}), "prompt")["params"]["max_tokens"] == 600
+
+    def test_input_validation_rejects_non_text(self):
+        """Test that short or symbol-heavy inputs fail the deterministic pre-check."""
+        from app.workflows.nodes import input_validation_node
+
+        state = {
+            "resume_posting": "{}[]();=<>/*-+ 0123456789 " * 10,
+            "job_posting": "Senior engineer building reliable backend services in Python. " * 3
+        }
+        result = input_validation_node(state)
+
+        assert result["validation_failed"] is True
+        assert result["validation_error"]["resume_issues"] == ["Resume does not look like readable text"]
+        assert result["validation_error"]["job_issues"] == []
+
+    def test_input_validation_accepts_number_heavy_resume(self):
+        """Test that dates, metrics and layout padding do not fail the readability check."""
+        from app.workflows.nodes import input_validation_node
+
+        resume = (
+            "JANE DOE          (555) 123-4567          jane.doe@example.com\n"
+            "Senior Data Analyst          2019 - 2024          Acme Corp, NY 10001\n"
+            "  -  Cut reporting time 45% across 12 teams; saved $250K/yr\n"
+            "  -  Built 30+ SQL dashboards serving 1,200 users\n"
+            "Data Analyst          2016 - 2019          Beta Inc, Boston MA 02110\n"
+            "  -  Grew forecast accuracy from 72% to 91% (Q3 2018)\n"
+            "B.S. Statistics, 2016, GPA 3.8/4.0\n"
+        )
+        state = {
+            "resume_posting": resume,
+            "job_posting": "Senior engineer building reliable backend services in Python. " * 3
+        }
+        result = input_validation_node(state)
+
+        assert "validation_failed" not in result
+
+    def test_validator_tracks_revision_budget(self):
+        """Test that each validation counts a draft and keeps the previous score."""
+        from app.workflows import nodes
+
+        state = {"cover_letter": "Draft", "job_info": {"title": "Engineer"}}
+        responses = iter(['{"valid": false, "issues": ["Generic"], "score": 0.5}', '{"valid": false, "issues": ["Generic"], "score": 0.52}'])
+        with patch.object(nodes.ai_service, 'invoke_with_retry', side_effect=lambda **kwargs: next(responses)):
+            state = nodes.cover_letter_validator_node(state)
+            state = nodes.cover_letter_validator_node(state)
+
+        assert state["revision_count"] == 2
+        assert state["prior_score"] == 0.5
+        assert state["validation_result"]["score"] == 0.52
+
+    def test_traced_validator_keeps_verdict_and_best_draft(self):
+        """Test that with tracing enabled the validator node is traced and still records its verdict."""
+        import importlib
+        from app.core.tracing import tracing_service
+        from app.workflows import nodes
+
+        langfuse = MagicMock()
+        try:
+            with patch.object(tracing_service, 'langfuse', langfuse):
+                importlib.reload(nodes)
+                with patch.object(nodes.ai_service, 'invoke_with_retry', return_value='{"valid": false, "issues": ["Generic"], "score": 0.6}'):
+                    state = nodes.cover_letter_validator_node({"cover_letter": "Draft", "job_info": {"title": "Engineer"}})
+        finally:
+            importlib.reload(nodes)
+
+        langfuse.start_as_current_span.assert_called_once_with(name="langgraph_node_cover_letter_validator")
+        assert state["validation_result"]["score"] == 0.6
+        assert state["best_letter"] == "Draft"
+        assert state["best_score"] == 0.6
+
+    def test_speculative_validator_keeps_draft_on_rejection(self):
+        """Test that a rejected letter leaves the concurrently generated draft for the next round."""
+        from app.workflows import nodes
+
+        state = {
+            "cover_letter": "First draft",
+            "job_info": {"title": "Engineer"},
+            "matched_experiences": [{"title": "Developer"}]
+        }
+        with patch.object(nodes, 'cover_letter_validator_node') as mock_validate, \
+             patch.object(nodes, '_generate_draft', return_value="Second draft"):
+            mock_validate.side_effect = lambda s: {**s, "validation_result": {"valid": False, "issues": ["Too short"]}}
+            rejected = nodes.speculative_validator_node(dict(state))
+            mock_validate.side_effect = lambda s: {**s, "validation_result": {"valid": True, "issues": []}}
+            accepted = nodes.speculative_validator_node(dict(state))
+
+        assert rejected["speculative_letter"] == "Second draft"
+        assert nodes.adopt_draft_node(rejected)["cover_letter"] == "Second draft"
+        assert accepted["speculative_letter"] is None
+
+    def test_speculative_graph_does_not_readopt_rejected_draft(self):
+        """Test that a failed speculative draft falls back to the generator instead of re-adopting the last one."""
+        from app.workflows import graph, nodes
+
+        document = "Experienced software developer building reliable web services and APIs. " * 3
+        verdicts = iter([
+            '{"valid": false, "issues": ["Generic"], "score": 0.3}',
+            '{"valid": false, "issues": ["Too long"], "score": 0.5}',
+            '{"valid": true, "issues": [], "score": 0.9}'
+        ])
+        letters = iter(["Draft 1", "Draft 3"])
+
+        def invoke(**kwargs):
+            if kwargs["metadata"]["operation"] == "cover_letter_validation":
+                return next(verdicts)
+            return next(letters)
+
+        with patch.object(graph.settings, 'SPECULATIVE_RETRIES', True), \
+             patch.object(nodes.ai_service, 'invoke_with_retry', side_effect=invoke), \
+             patch.object(nodes, '_generate_draft', side_effect=["Draft 2", None, None]):
+            result = graph.create_cover_letter_graph().invoke({
+                "resume_posting": document,
+                "job_posting": document,
+                "tone": "professional",
+                "resume_info": {"name": "Jane", "experience": [], "education": []},
+                "job_info": {"title": "Engineer", "company": "Acme"}
+            })
+
+        assert result["cover_letter"] == "Draft 3"
+        assert result["revision_count"] == 3
+
+    def test_graph_keeps_best_draft_when_revision_scores_lower(self):
+        """Test that a rewrite scoring below the previous draft does not replace it."""
+        from app.workflows import graph, nodes
+
+        document = "Experienced software developer building reliable web services and APIs. " * 3
+        verdicts = iter([
+            '{"valid": false, "issues": ["Generic"], "score": 0.6}',
+            '{"valid": false, "issues": ["Too long"], "score": 0.3}'
+        ])
+        letters = iter(["Draft 1", "Draft 2"])
+
+        def invoke(**kwargs):
+            if kwargs["metadata"]["operation"] == "cover_letter_validation":
+                return next(verdicts)
+            return next(letters)
+
+        with patch.object(graph.settings, 'SPECULATIVE_RETRIES', False), \
+             patch.object(nodes.ai_service, 'invoke_with_retry', side_effect=invoke):
+            result = graph.create_cover_letter_graph().invoke({
+                "resume_posting": document,
+                "job_posting": document,
+                "tone": "professional",
+                "resume_info": {"name": "Jane", "experience": [], "education": []},
+                "job_info": {"title": "Engineer", "company": "Acme"}
+            })
+
+        assert result["revision_count"] == 2
+        assert result["best_score"] == 0.6
+        assert result["cover_letter"] == "Draft 1"
+
+    @pytest.mark.asyncio
+    async def test_streaming_drains_pipeline_queue(self):
+        """Test that frames produced by the pipeline task are forwarded in order."""
+        from app.services.graph_service import GraphService
+
+        async def fake_frames(self, state):
+            yield b"data: first\n\n"
+            yield b"data: done\n\n"
+
+        with patch.object(GraphService, '_pipeline_frames', fake_frames):
+            frames = [frame async for frame in GraphService().invoke_graph_streaming({})]
+
+        assert frames == [b"data: first\n\n", b"data: done\n\n"]
+
     @pytest.mark.asyncio
     async def test_invoke_graph_with_feedback(self):
         """Test feedback processing."""
@@ -96,7 +96,15 @@ export default function Home() {
                 
               } catch {
                 // Fallback to old format for backward compatibility
-                if (msg.startsWith('FINAL_COVER_LETTER::')) {
+                if (msg.startsWith('TOKEN::')) {
+                  // Streamed generation delta; the final result replaces the accumulated text
+                  try {
+                    const { delta } = JSON.parse(msg.replace('TOKEN::', ''));
+                    setCoverLetter(prev => prev + delta);
+                  } catch {
+                    // Ignore a malformed delta; FINAL_COVER_LETTER carries the full letter
+                  }
+                } else if (msg.startsWith('FINAL_COVER_LETTER::')) {
                   const jsonStr = msg.replace('FINAL_COVER_LETTER::', '');
                   try {
                     const obj = JSON.parse(jsonStr);
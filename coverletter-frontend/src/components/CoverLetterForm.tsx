@@ -12,7 +12,7 @@ interface CoverLetterFormProps {
 export default function CoverLetterForm({ onSubmit, isLoading }: CoverLetterFormProps) {
   const [resumeFile, setResumeFile] = useState<File | null>(null);
   const [jobDescription, setJobDescription] = useState('');
-  const [tone, setTone] = useState('Professional, concise, and clearly tailored to the role. Direct, specific, and achievement-focused. Avoids filler, excessive warmth, or verbosity.');
+  const [tone, setTone] = useState('professional');
   
   const fileInputRef = useRef<HTMLInputElement>(null);
 
@@ -161,16 +161,16 @@ export default function CoverLetterForm({ onSubmit, isLoading }: CoverLetterForm
             onChange={(e) => setTone(e.target.value)}
             className="block w-full rounded-md border-neutral-300 shadow-sm focus:border-primary-500 focus:ring-primary-500 sm:text-sm bg-white text-neutral-900"
           >
-            <option value="Professional, concise, and clearly tailored to the role. Direct, specific, and achievement-focused. Avoids filler, excessive warmth, or verbosity.">
+            <option value="professional">
               🧑‍💼 Professional & Concise — Direct, specific, and achievement-focused
             </option>
-            <option value="Emotionally intelligent, detailed, and clearly tailored to the role and mission. Shows initiative, reflection, and care — top-tier cover letter.">
+            <option value="emotional">
               🧠 Emotionally Intelligent & Detailed — Insightful and thorough
             </option>
-            <option value="Confident, enthusiastic, and results-oriented. Emphasizes achievements and impact.">
+            <option value="confident">
               💪 Confident & Enthusiastic — Bold and achievement-focused
             </option>
-            <option value="Creative, innovative, and forward-thinking. Shows unique perspective and problem-solving approach.">
+            <option value="creative">
               🚀 Creative & Innovative — Unique perspective and problem-solving
             </option>
           </select>
@@ -112,8 +112,7 @@ export default function CoverLetterResult({
 
   // Progress bar steps for LangGraph flow
   const progressSteps = [
-    { step: "Parsing resume...", icon: "📄", description: "Extracting your experience and skills" },
-    { step: "Parsing job description...", icon: "🏢", description: "Analyzing job requirements" },
+    { step: "Parsing resume and job description...", icon: "📄", description: "Extracting your experience and the job requirements" },
     { step: "Matching experiences...", icon: "🎯", description: "Finding relevant matches" },
     { step: "Generating cover letter...", icon: "✍️", description: "Creating your personalized letter" },
     { step: "Validating output...", icon: "✅", description: "Quality checking the result" }